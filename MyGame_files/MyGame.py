@@ -1,14 +1,32 @@
 __author__ = 'ElectroNick'
 
 
+import os
+import argparse
+import functools
 import pygame
 import math
-import random
 import MyGame_objects as Things
 import MyGame_game_play as GPlay
 import MyGame_intro as Intro
+import MyGame_spatial as Spatial
+import MyGame_foes as Herd
+import MyGame_profile as Profile
+import MyGame_random as Dice
+import MyGame_replay as Replay
+import MyGame_scheduler as Timing
 import sqlite3 as sql
 
+TICKS_PER_SECOND = 60  # the game always moves this many steps a second however many frames are drawn
+MAX_CATCH_UP = 0.25  # the most seconds of ticks run without drawing, so a slow computer slows the game instead
+
+# The kinds of plants in order of increasing size for proper overlapping:
+# name, kind of food, image and the standard deviation of their distance from the center of their cluster
+PLANTS = [('grain1', 'grain', 'plants\\grain1.png', 50), ('grain2', 'grain', 'plants\\grain2.png', 50),
+          ('flower1', 'root', 'plants\\flower1.png', 80), ('flower2', 'root', 'plants\\flower2.png', 80),
+          ('vine1', 'vegetable', 'plants\\vine1.png', 150), ('vine2', 'vegetable', 'plants\\vine2.png', 150),
+          ('fruit1', 'fruit', 'plants\\fruit1.png', 200), ('fruit2', 'fruit', 'plants\\fruit2.png', 200)]
+
 
 def rand_position(view, background, amount=1):
     """
@@ -19,12 +37,47 @@ def rand_position(view, background, amount=1):
     :return: List of the specified amount of random x,y value pair lists that fall within the view and background area
     """
     if amount >= 1:
-        rand_p = []
-        for s in range(amount):
-            x = random.randint(0 + view.get_border(), background.rect.w - view.get_border())
-            y = random.randint(0 + view.get_border(), background.rect.h - view.get_border())
-            rand_p.append([x, y])
-        return rand_p
+        xs = Dice.ints('spawn', 0 + view.get_border(), background.rect.w - view.get_border(), amount)
+        ys = Dice.ints('spawn', 0 + view.get_border(), background.rect.h - view.get_border(), amount)
+        return [[int(x), int(y)] for x, y in zip(xs, ys)]
+
+
+def scatter(centers, deviations, amount):
+    """
+    Models the location of plants to each other in nature using a normal distribution around the center of each
+    cluster. Every position is made at once.
+    :param centers: list of x, y centers of the clusters
+    :param deviations: list of the standard deviation around each center. 1 if negative
+    :param amount: the number of positions around each center
+    :return: list with a list of the amount of x, y positions for each center
+    """
+    deviations = [d if d >= 0 else 1 for d in deviations]
+    offsets = Dice.normals('spawn', 0, 1, len(centers) * amount * 2)
+    numpy = Dice.numpy
+    if numpy is None:
+        positions = []
+        n = 0
+        for (cx, cy), d in zip(centers, deviations):
+            cluster = []
+            for a in range(amount):
+                cluster.append([cx + d * offsets[n], cy + d * offsets[n + 1]])
+                n += 2
+            positions.append(cluster)
+        return positions
+    offsets = offsets.reshape(len(centers), amount, 2)
+    positions = (numpy.array(centers, dtype=numpy.float64)[:, None, :] +
+                 numpy.array(deviations, dtype=numpy.float64)[:, None, None] * offsets)
+    return positions.tolist()
+
+
+def image_radius(image_file):
+    """
+    Returns the radius of the circle a thing takes up when it is placed, see Spatial.Placer
+    :param image_file: File name of its image
+    :return: half the width or height of the image, whichever is smaller
+    """
+    rect = GPlay.load_image(image_file, -1)[1]
+    return min(rect.w, rect.h) / 2
 
 
 def special_damage_effects(critical, broken):
@@ -53,18 +106,43 @@ def special_damage_effects(critical, broken):
 
 
 # The main loop
-def main():
+def main(dirty_rects=False, headless=False, script=None, max_frames=None, number_foes=7, number_plants=10, timer=None,
+         seed=None, recorder=None, max_fps=60, render_every=1, interpolate=False):
     """
     This function is called when the program starts.
     It initializes everything it needs, then runs the game in
     a loop until the function returns meaning the game ends.
+    :param dirty_rects: when True only the parts of the screen that changed are redrawn while the background is still
+    :param headless: when True there is no introduction, music, starting delay or ending screens and the ticks run as
+        fast as possible instead of TICKS_PER_SECOND. Usually used through run_headless.
+    :param script: ScriptedInput object whose key presses are added to the keyboard's at each tick
+    :param max_frames: the game stops after this many ticks. Never stops if None
+    :param number_foes: the number of each kind of foe
+    :param number_plants: the number of each kind of plant. Important for balancing the healing
+    :param timer: Profiler object to measure each phase of every frame. Nothing is measured until the profile
+        button shows the measurements on the screen if None
+    :param seed: integer seed for the random numbers, so the same seed plays the same game. A random one if None
+    :param recorder: Recorder object to record the key presses to play the game again. Nothing is recorded if None
+    :param max_fps: the most frames drawn a second. As many as possible if 0
+    :param render_every: when headless a frame is drawn after this many ticks. Nothing is drawn if 0
+    :param interpolate: when True the scrolling is drawn between the last two ticks, so it is smooth when more frames
+        are drawn than ticks. Only the whole screen can be drawn like that, so it does nothing with dirty_rects
+    :return: dictionary of the 'outcome' ('quit', 'success', 'burned', 'died' or 'stopped'), the number of ticks as
+        'frames' and the 'seed' used
     """
 
 # set up variables
+    seed = Dice.seed(seed)  # every random number of the game comes from streams made from this seed
+    if recorder is not None:
+        recorder.start(seed, number_foes, number_plants)
+    if timer is None:
+        timer = Profile.Profiler(enabled=False)
+    profiling = timer.get_enabled()  # whether to keep measuring when the measurements are hidden
+    show_profile = False
+
     # movement buttons
     buttons = GPlay.Buttons()
     buttons.set_move_buttons()  # use to set the buttons the player uses to move the main character
-    keys = [False, False, False, False]  # initialize a list of the keyboard keys used for direction
 
     # screen parameters
     normal_border = 30 * 2  # border: minimum of 30 for MC.
@@ -72,50 +150,67 @@ def main():
     screen_height = 600
     view = GPlay.Viewer(screen_width, screen_height, border=normal_border)
 
-    pygame.mixer.init()
-    music_file = """data\\Dvorak Symphony No.9 III Scherzo - Molto vivace (online-audio-converter.com).wav"""
-    music = pygame.mixer.Sound(music_file)
-    # freely available from: http://imslp.org/wiki/Symphony_No.9,_Op.95_%28Dvo%C5%99%C3%A1k,_Anton%C3%ADn%29
-    music.set_volume(0.5)  # 0.0 - 1.0
+    depth = 0  # the best color depth for the display
+    music = None
+    if headless:
+        depth = 32  # the dummy display would otherwise use slow 8 bit colors
+    else:
+        pygame.mixer.init()
+        music_file = GPlay.data_path("""Dvorak Symphony No.9 III Scherzo - Molto vivace (online-audio-converter.com).wav""")
+        music = pygame.mixer.Sound(music_file)
+        # freely available from: http://imslp.org/wiki/Symphony_No.9,_Op.95_%28Dvo%C5%99%C3%A1k,_Anton%C3%ADn%29
+        music.set_volume(0.5)  # 0.0 - 1.0
 
 # Initialize the game
     pygame.init()
-    pygame.display.set_mode((screen_width, screen_height))
+    pygame.display.set_mode((screen_width, screen_height), 0, depth)
     pygame.display.set_caption('Cabin Fever')
     pygame.mouse.set_visible(0)  # do not show mouse
 
     # Background
-    background = GPlay.Background('background\\large_grass.png')  # grassX4, 'test_map.png')
+    # 15 * 200 pixel tiles wide and high, the same size as 'background\\large_grass.png'
+    background = GPlay.TiledBackground(['background\\grass.png', 'background\\grass2.png'], 15, 15)
     map_pos_x = 0  # the inverted initial starting position of the main character
     map_pos_y = 0  # starts the main character at the top left corner of the map
-    world = pygame.sprite.RenderPlain(background)
 
 
 # Prepare Game Objects
     clock = pygame.time.Clock()
     eat = Things.Eating()
 
+    # house
+    cell_size = 200  # for the groups that are searched for collisions
+    house_hold = Things.Group()
+    my_house = Things.Item('house', "background\\house.png", [400, 100], tag=Things.HOUSE)
+    house = Things.Group(cell_size=cell_size)
+    house.add(my_house)
+    fire_spread = 40
+
+    # everything is placed apart from each other, off the house and away from where the fires start:
+    # 3 standard deviations around the house plus the size of a fire
+    placer = Spatial.Placer(background.rect.w, background.rect.h)
+    anywhere = functools.partial(rand_position, view, background)  # new places for the ones that overlap something
+    placer.exclude(my_house.get_world_rect())
+    fire_area = GPlay.load_image("background\\fire4.png", -1)[1].inflate(fire_spread * 6, fire_spread * 6)
+    fire_area.center = my_house.get_start_position()
+    placer.exclude(fire_area)
+
+    # every random place on the background at once: the center of each kind of plant's cluster, the foes and the mud
+    rand_pos = rand_position(view, background, amount=len(PLANTS) + number_foes * 3 + 3)
+
+    # obstacles
+    muddy = Things.Group(cell_size=cell_size)
+    puddle = Things.Group(cell_size=cell_size)
+    mud_pos = placer.keep_apart(rand_pos[-3:], image_radius("background\\mud.png"), anywhere)
+    muddy.add([Things.Item("mud", "background\\mud.png", p, tag=Things.MUD) for p in mud_pos])
+
     # plants
-    plants = Things.Group()
-    number_plants = 10  # important for balancing the healing
-    rand_pos = rand_position(view, background, amount=11)
-    # puts item in a random place on the background
-    for p in range(number_plants):  # in order of increasing size for proper overlapping
-        plants.add(Things.Food('grain1', eat.kinds_of_food()[2], 'plants\\grain1.png', rand_pos[6], deviation=50))
-    for p in range(number_plants):
-        plants.add(Things.Food('grain2', eat.kinds_of_food()[2], 'plants\\grain2.png', rand_pos[7], deviation=50))
-    for p in range(number_plants):
-        plants.add(Things.Food('flower1', eat.kinds_of_food()[1], 'plants\\flower1.png', rand_pos[0], deviation=80))
-    for p in range(number_plants):
-        plants.add(Things.Food('flower2', eat.kinds_of_food()[1], 'plants\\flower2.png', rand_pos[1], deviation=80))
-    for p in range(number_plants):
-        plants.add(Things.Food('vine1', eat.kinds_of_food()[3], 'plants\\vine1.png', rand_pos[4], deviation=150))
-    for p in range(number_plants):
-        plants.add(Things.Food('vine2', eat.kinds_of_food()[3], 'plants\\vine2.png', rand_pos[5], deviation=150))
-    for p in range(number_plants):
-        plants.add(Things.Food('fruit1', eat.kinds_of_food()[0], 'plants\\fruit1.png', rand_pos[2], deviation=200))
-    for p in range(number_plants):
-        plants.add(Things.Food('fruit2', eat.kinds_of_food()[0], 'plants\\fruit2.png', rand_pos[3], deviation=200))
+    plants = Things.Group(cell_size=cell_size)
+    clusters = scatter(rand_pos[:len(PLANTS)], [plant[3] for plant in PLANTS], number_plants)
+    for (name, kind, image_file, deviation), center, cluster in zip(PLANTS, rand_pos, clusters):
+        cluster = placer.keep_apart(cluster, image_radius(image_file),
+                                    lambda amount: scatter([center], [deviation], amount)[0])
+        plants.add([Things.Food(name, kind, image_file, p, deviation=deviation, scatter=False) for p in cluster])
 
     # start the player in the center of the view
     mc_images = {"up": "main_character\\guy_up.png", "right": "main_character\\guy_right.png",
@@ -125,11 +220,12 @@ def main():
     character = pygame.sprite.GroupSingle()  # only holds one sprite at a time or none
     character.add(mc)
     barrier = False
-    run = False
+    effects = GPlay.Effects()  # running and poison, which wear off when their timers are due
     full_r = False
     full_l = False
 
-    # foes
+    # foes. None of their groups keep a SpatialHash: the foe engine finds the foes near the window and the ones
+    # touching the main character where they are, not where their sprites were last updated
     wolves = Things.Group()
     birds = Things.Group()
     spiders = Things.Group()
@@ -141,48 +237,47 @@ def main():
     spider_images = {"up": "animals\\spider_up.png", "right": "animals\\spider_right.png",
                      "left": "animals\\spider_left.png", "down": "animals\\spider_down.png"}
 
-    number_foes = 7
-    rand_foe_pos = rand_position(view, background, amount=number_foes*3)
-    for pace in range(number_foes):
-        birds.add(Things.Foe(bird_images, start_pos=rand_foe_pos[pace]))
-    for pace in range(number_foes):
-        wolves.add(Things.Foe(animal_images, start_pos=rand_foe_pos[pace + number_foes]))
-    for pace in range(number_foes):
-        spiders.add(Things.Foe(spider_images, start_pos=rand_foe_pos[pace + number_foes * 2]))
-
-    rand_pace = []
-    for n in range(number_foes * 3):
-        r = random.randint(10, 1000)
-        rand_pace.append(r)
+    rand_foe_pos = rand_pos[len(PLANTS):len(PLANTS) + number_foes * 3]
+    bird_pos = placer.keep_apart(rand_foe_pos[:number_foes], image_radius(bird_images["up"]), anywhere)
+    wolf_pos = placer.keep_apart(rand_foe_pos[number_foes:number_foes * 2], image_radius(animal_images["up"]),
+                                 anywhere)
+    spider_pos = placer.keep_apart(rand_foe_pos[number_foes * 2:], image_radius(spider_images["up"]), anywhere)
+    birds.add([Things.Foe(bird_images, start_pos=p) for p in bird_pos])
+    wolves.add([Things.Foe(animal_images, start_pos=p) for p in wolf_pos])
+    spiders.add([Things.Foe(spider_images, start_pos=p) for p in spider_pos])
+
+    rand_pace = [int(r) for r in Dice.ints('spawn', 10, 1000, number_foes * 3)]
     foes = Things.Group()
     foes.add(wolves, birds, spiders)
 
+    # moves every foe at once
+    foe_engine = Herd.FoeEngine(view)
+    pace = 0
+    for e in wolves:
+        foe_engine.add(e, Herd.PACE_HORIZONTAL, sec=rand_pace[pace])
+        pace += 1
+    for e in birds:
+        foe_engine.add(e, Herd.DIAMOND, sec=rand_pace[pace])
+        pace += 1
+    for e in spiders:
+        foe_engine.add(e, Herd.SQUARE, sec=rand_pace[pace])
+        pace += 1
+
     bird_damage = False
     wolf_damage = False
-    spider_damage = False
-    poisoned = False
 
     # balancing
     poison_time = 5  # number of seconds the poison acts
     p_strength = 55  # strength of the spider's poison
 
-    # obstacles
-    muddy = Things.Group()
-    puddle = Things.Group()
-    rand_mud_pos = rand_position(view, background, amount=3)
-    for m in range(3):
-        muddy.add(Things.Item("mud", "background\\mud.png", rand_mud_pos[m]))
-
-    # house
-    house_hold = Things.Group()
-    my_house = Things.Item('house', "background\\house.png", [400, 100])
-    house = Things.Group()
-    house.add(my_house)
-
     # fire
-    fires = Things.Group()
-    fire_spread = 40
-    progress(4, fires, puddle, fire_spread, view, background)
+    fires = Things.Group(cell_size=cell_size)
+    # the fires and puddles are used again so none are made in the middle of the game
+    fire_pool = Things.Pool(lambda: Things.Item('fire', "background\\fire4.png", [0, 0], tag=Things.FIRE))
+    puddle_pool = Things.Pool(lambda: Things.Item("puddle", "background\\puddle.png", [0, 0], tag=Things.PUDDLE))
+    fire_pool.fill(7)  # the house burns down with 7 fires
+    puddle_pool.fill(7)
+    progress(4, fires, puddle, fire_spread, view, background, fire_pool, puddle_pool, placer)
 
     ending = Things.Group()
     success = GPlay.HUD("background\\success.png", [0, 30])
@@ -200,26 +295,8 @@ def main():
     damage = [0, 0, 0, 0, 0, False]
     healing = [0, 0, 0, 0, 0]
     poison_strength = 1
-    green, orange, yellow, red = mc.health.all_hud()
-    health_meter_green = pygame.sprite.RenderPlain(green)  # green is always on
-
-    health_head_meter_orange = pygame.sprite.RenderPlain(orange[0])
-    health_torso_meter_orange = pygame.sprite.RenderPlain(orange[1])
-    health_r_arm_meter_orange = pygame.sprite.RenderPlain(orange[2])
-    health_l_arm_meter_orange = pygame.sprite.RenderPlain(orange[3])
-    health_legs_meter_orange = pygame.sprite.RenderPlain(orange[4])
-
-    health_head_meter_yellow = pygame.sprite.RenderPlain(yellow[0])
-    health_torso_meter_yellow = pygame.sprite.RenderPlain(yellow[1])
-    health_r_arm_meter_yellow = pygame.sprite.RenderPlain(yellow[2])
-    health_l_arm_meter_yellow = pygame.sprite.RenderPlain(yellow[3])
-    health_legs_meter_yellow = pygame.sprite.RenderPlain(yellow[4])
-
-    health_head_meter_red = pygame.sprite.RenderPlain(red[0])
-    health_torso_meter_red = pygame.sprite.RenderPlain(red[1])
-    health_r_arm_meter_red = pygame.sprite.RenderPlain(red[2])
-    health_l_arm_meter_red = pygame.sprite.RenderPlain(red[3])
-    health_legs_meter_red = pygame.sprite.RenderPlain(red[4])
+    health_hud = GPlay.HealthHUD(mc.health)  # only the watched character loads the health pictures
+    health_rect = health_hud.get_rect()  # the area covered by the health bar
 
     # holding pictures
     holding_r = GPlay.HUD('health_bar/holding_object.png', [19 * 2 + 26 - 10 + 2, 18 + 2 + 3])
@@ -246,169 +323,302 @@ def main():
     status_hud.fill(text_fill)
     status_hud.set_colorkey(text_fill)
 
+    profile_hud = pygame.Surface((300, 400))
+    profile_position = (screen_width - profile_hud.get_width(), text_position[1])
+    profile_hud.fill(text_fill)
+    profile_hud.set_colorkey(text_fill)
+    profile_lines = None
+
+    text_rect = pygame.Rect(text_position, text_hud.get_size())
+    progress_rect = pygame.Rect(progress_position, progress_hud.get_size())
+    status_rect = pygame.Rect(status_position, status_hud.get_size())
+    profile_rect = pygame.Rect(profile_position, profile_hud.get_size())
+
     pygame.font.init()
     font = pygame.font.Font(None, 22, bold=False)
+    text_color = (10, 10, 10)  # dark gray
+    glyphs = GPlay.GlyphAtlas(font, text_color)  # for the text with numbers that change often
+    shown_text = None  # the text on each HUD surface so they are only drawn again when it changes
+    shown_progress = None
+    shown_status = None
+
+    renderer = GPlay.DirtyRenderer(view, enabled=dirty_rects)
 
     # clocks
-    fire_timer = 0
-    poison_counter = 0
+    scheduler = Timing.Scheduler()  # timers counted in ticks
     ouch_counter = 0
-    ouch_flash_timer = 0
-    run_timer = 0
-    s = 0
-    m = 0
-
-    # introductory text screen
-    q = Intro.intro()
-    music.play(loops=-1)
-    screen = pygame.display.set_mode((screen_width, screen_height))
-
-    # delays the beginning of the game so the music starts when the picture does
-    delay = True
-    d_count = 0
-    while delay:
-        clock.tick(60)
-        d_count += 1
-        if d_count >= 60 * 2.5:  # 2.5 seconds
-            delay = False
-        if q == 'q':  # exits the program entirely if esc is pressed or window is closed
-            return
+
+    frame = 0
+    last_tested = 0  # rectangles compared for collisions before this frame
+    if headless:
+        screen = pygame.display.get_surface()
+    else:
+        # introductory text screen
+        q = Intro.intro()
+        music.play(loops=-1)
+        screen = pygame.display.set_mode((screen_width, screen_height))
+
+        # delays the beginning of the game so the music starts when the picture does
+        scheduler.schedule('start', TICKS_PER_SECOND * 5 / 2)  # 2.5 seconds
+        while True:
+            clock.tick(TICKS_PER_SECOND)
+            if q == 'q':  # exits the program entirely if esc is pressed or window is closed
+                return {'outcome': 'quit', 'frames': frame, 'seed': seed}
+            if 'start' in scheduler.advance():
+                break
 
 
 # Main Loop
+    # Each time through the loop either runs one tick of the game or, once the ticks have caught up with the clock,
+    # draws a frame. So the game runs at the same speed however fast the frames are drawn.
+    ticks_due = 1.0  # the ticks still to run to catch up with the clock. Starts with one so there is a frame to draw
+    if not headless:
+        render_every = 1
+    interpolate = interpolate and not dirty_rects
+    pos = last_pos = [map_pos_x, map_pos_y]
+    scheduler.schedule('second', 1, every=TICKS_PER_SECOND)  # damage, healing and eating
+    # a new fire just after the first minute, then every 2 minutes
+    scheduler.schedule('fire', 61 * TICKS_PER_SECOND + 1, every=2 * 60 * TICKS_PER_SECOND, callback=progress,
+                       args=(1, fires, puddle, fire_spread, view, background, fire_pool, puddle_pool, placer))
+    timer.setup_done()
+    timer.start_frame()
     while mc.health.get_alive():  # while True
-        clock.tick(60)
-
-        s += 1
-        if s >= 60:  # cycles every second
-            s = 0
-        if s == 0:
-            m += 1
-        if m >= 60:  # cycles every minute
-            m = 0
+        if ticks_due < 1 and render_every:  # caught up with the clock so draw a frame
+            # Draw Everything
+            timer.mark('draw')
+            offset = None  # how far the view is drawn from where the last tick left it
+            draw_pos = pos
+            if interpolate and pos != last_pos:  # draw the scrolling between the last two ticks
+                draw_pos = [int(round(last_pos[0] + (pos[0] - last_pos[0]) * ticks_due)),
+                            int(round(last_pos[1] + (pos[1] - last_pos[1]) * ticks_due))]
+                offset = (draw_pos[0] - pos[0], draw_pos[1] - pos[1])
+                background.update(draw_pos)
+            text = str(mc.health)
+            fires_text = 'Fires: ' + str(len(fires.sprites()))
+
+            # find what changed since the last frame
+            renderer.begin(draw_pos)
+            renderer.track(plants.get_visible())
+            renderer.track(muddy.get_visible())
+            renderer.track(puddle.get_visible())
+            if special[0] is False:
+                renderer.track(foes.get_visible())
+                renderer.track(character)
+            renderer.track(house.get_visible())
+            renderer.track(fires.get_visible())
+            renderer.track_state('text', text_rect, text)
+            renderer.track_state('progress', progress_rect, fires_text)
+            renderer.track_state('status', status_rect, status)
+            renderer.track_state('health', health_rect, health_hud.get_layers())
+            renderer.track_state('hold right', holding_r.rect, bool(hold_right))
+            renderer.track_state('hold left', holding_l.rect, bool(hold_left))
+            renderer.track_state('profile', profile_rect, profile_lines)
+
+            with timer.scope('background'):
+                blits = renderer.draw_background(screen, background)  # only the visible or changed part
+            if offset is not None:
+                background.update(pos)  # the ticks scroll from where the last tick left it
+            blits += plants.draw_visible(screen, offset)
+            blits += muddy.draw_visible(screen, offset)
+            blits += puddle.draw_visible(screen, offset)
+            if special[0] is False:  # makes blind
+                blits += foes.draw_visible(screen, offset)
+                character.draw(screen)
+                blits += 1
+            blits += house.draw_visible(screen, offset)
+            blits += fires.draw_visible(screen, offset)
+
+            timer.mark('text')
+            if text != shown_text:  # only drawn again when the text changes
+                text_hud.fill(text_fill)
+                glyphs.draw(text_hud, text, (0, 0))
+                shown_text = text
+                blits += len(text)
+            if fires_text != shown_progress:
+                progress_hud.fill(text_fill)
+                glyphs.draw(progress_hud, fires_text, (0, 0))
+                shown_progress = fires_text
+                blits += len(fires_text)
+            if status != shown_status:
+                status_hud.fill(text_fill)
+                status_hud.blit(GPlay.text_cache.render(font, status, text_color), (0, 0))  # with anti-aliasing
+                shown_status = status
+                blits += 1
+
+            screen.blit(text_hud, text_position)
+            screen.blit(progress_hud, progress_position)
+            screen.blit(status_hud, status_position)
+            blits += 3
+
+            if show_profile:
+                if profile_lines is None or frame % 30 == 0:  # twice a second so it can be read
+                    profile_lines = timer.overlay()
+                    profile_hud.fill(text_fill)
+                    for i, line in enumerate(profile_lines):
+                        glyphs.draw(profile_hud, line, (0, i * 16))
+                screen.blit(profile_hud, profile_position)
+                blits += 1
+            else:
+                profile_lines = None
+
+            # Draw the health bar
+            timer.mark('hud')
+            blits += health_hud.draw(screen)  # one picture that is only drawn again when the health changes
+
+            if hold_right:
+                hold_r.draw(screen)
+            if hold_left:
+                hold_l.draw(screen)
+            timer.count('blits', blits + bool(hold_right) + bool(hold_left))
+
+            # send everything to the screen
+            timer.mark('present')
+            renderer.present()
+            timer.end_frame()
+            if headless:  # no clock, so it draws after every render_every ticks
+                ticks_due += render_every
+            else:  # wait so there are at most max_fps frames a second, and catch up on the ticks that passed
+                ticks_due = min(ticks_due + clock.tick(max_fps) * TICKS_PER_SECOND / 1000.0,
+                                MAX_CATCH_UP * TICKS_PER_SECOND)
+            timer.start_frame()
+            continue
+
+        ticks_due = max(0.0, ticks_due - 1)
+        timer.mark('input')
+        frame += 1
+        if max_frames is not None and frame > max_frames:
+            return {'outcome': 'stopped', 'frames': frame - 1, 'seed': seed}
+        if script is not None:
+            script.post(frame)  # adds the scripted key presses to the keyboard's
+        if recorder is not None:
+            recorder.start_frame(frame)
+        due = scheduler.advance()  # the names of the timers due this tick
 
         # special effects
         status = ''
         special = special_damage_effects(mc.health.get_critical(), mc.health.get_broken())
 
         # Handle Input Events
+        actions = []  # what the keys pressed this tick do, in the order they were pressed
         for event in pygame.event.get():
+            if recorder is not None:
+                recorder.add(event)
             # end the game
             if event.type == pygame.QUIT:
-                return
+                return {'outcome': 'quit', 'frames': frame, 'seed': seed}
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                return
+                return {'outcome': 'quit', 'frames': frame, 'seed': seed}
             # get key presses
             if event.type == pygame.KEYDOWN:  # if a key is pressed down
-                if event.key == buttons.get_up():  # up
-                    keys[0] = True    # changes the first element of the keys list to true when the w button is pressed
-                elif event.key == buttons.get_left():  # left
-                    keys[1] = True
-                elif event.key == buttons.get_down():  # down
-                    keys[2] = True
-                elif event.key == buttons.get_right():  # right
-                    keys[3] = True
-                elif event.key == buttons.get_run():
-                    run = True
-
-                # pick up item
-                elif event.key == buttons.get_pickup_right():
-                    # pick up item unless numb arm but can still eat what was already picked up
-                    if special[2] is False and full_r is False:
-                        chomp_r = pygame.sprite.groupcollide(plants, character,  True, False)  # pick up items
-                        hold_right.add(chomp_r)  # adds first sprite in dictionary to inventory: plants
-                        for spr in hold_right.sprites():
-                            if str(spr).split()[0] not in eat.kinds_of_food():
-                                full_r = True  # the hand is full
-                elif event.key == buttons.get_pickup_left():
-                    # pick up item unless numb arm but can still eat what was already picked up
-                    if special[3] is False and full_l is False:
-                        chomp_l = pygame.sprite.groupcollide(plants, character,  True, False)  # pick up items
-                        hold_left.add(chomp_l)  # adds first sprite in dictionary to inventory: plants
-                        for spr in hold_left.sprites():
-                            if str(spr).split()[0] not in eat.kinds_of_food():
-                                full_l = True  # the hand is full
-
-                # eating
-                if event.key == buttons.get_eat_right():  # picking up and eating could be the same button
+                actions.extend(buttons.get_actions(event.key))
+        # the directions come from which keys are held down now, so a missed key release can't leave one stuck
+        keys = buttons.get_moves(script.get_pressed() if script is not None else pygame.key.get_pressed())
+
+        for action in actions:
+            if action == GPlay.RUN:
+                effects.start_running()
+                if not scheduler.is_scheduled('run over'):  # 2 seconds including this tick
+                    scheduler.schedule('run over', 2 * TICKS_PER_SECOND - 1, callback=effects.stop_running)
+
+            # pick up item
+            elif action == GPlay.PICKUP_RIGHT:
+                # pick up item unless numb arm but can still eat what was already picked up
+                if special[2] is False and full_r is False:
+                    chomp_r = plants.collide(Spatial.world_rect(mc.rect, [map_pos_x, map_pos_y]))
+                    for spr in chomp_r:
+                        spr.kill()  # pick up items
+                    hold_right.add(chomp_r)  # adds first sprite in dictionary to inventory: plants
                     for spr in hold_right.sprites():
-                        if str(spr).split()[0] in eat.kinds_of_food():
-                            eat_right.add(spr)
-                            hold_right.empty()
-                        elif str(spr).split()[0] not in eat.kinds_of_food():
-                            if pygame.sprite.groupcollide(character, house, False, False):
-                                # if touching the ship can place container in the ship
-                                house_hold.add(spr)
-                                hold_right.empty()
-                                house_hold.empty()
-                                full_r = False  # open hand
-                                # remove fire
-                                count_fire = 0
-                                for f in fires:
-                                    if count_fire >= 1:  # remove one at at time
-                                        break
-                                    else:
-                                        fires.remove(f)
-                                    count_fire += 1
-                if event.key == buttons.get_eat_left():
+                        if spr.tag != Things.FOOD:
+                            full_r = True  # the hand is full
+            elif action == GPlay.PICKUP_LEFT:
+                # pick up item unless numb arm but can still eat what was already picked up
+                if special[3] is False and full_l is False:
+                    chomp_l = plants.collide(Spatial.world_rect(mc.rect, [map_pos_x, map_pos_y]))
+                    for spr in chomp_l:
+                        spr.kill()  # pick up items
+                    hold_left.add(chomp_l)  # adds first sprite in dictionary to inventory: plants
                     for spr in hold_left.sprites():
-                        if str(spr).split()[0] in eat.kinds_of_food():
-                            eat_left.add(spr)
+                        if spr.tag != Things.FOOD:
+                            full_l = True  # the hand is full
+
+            # eating
+            elif action == GPlay.EAT_RIGHT:  # picking up and eating could be the same button, which then does both
+                for spr in hold_right.sprites():
+                    if spr.tag == Things.FOOD:
+                        eat_right.add(spr)
+                        hold_right.empty()
+                    else:
+                        if house.collide(Spatial.world_rect(mc.rect, [map_pos_x, map_pos_y])):
+                            # if touching the ship can place container in the ship
+                            house_hold.add(spr)
+                            hold_right.empty()
+                            house_hold.empty()
+                            puddle_pool.put(spr)  # the puddle can be used again
+                            full_r = False  # open hand
+                            # remove fire
+                            count_fire = 0
+                            for f in fires:
+                                if count_fire >= 1:  # remove one at at time
+                                    break
+                                else:
+                                    fire_pool.put(f)
+                                count_fire += 1
+            elif action == GPlay.EAT_LEFT:
+                for spr in hold_left.sprites():
+                    if spr.tag == Things.FOOD:
+                        eat_left.add(spr)
+                        hold_left.empty()
+                    else:
+                        if house.collide(Spatial.world_rect(mc.rect, [map_pos_x, map_pos_y])):
+                            house_hold.add(spr)
                             hold_left.empty()
-                        elif str(spr).split()[0] not in eat.kinds_of_food():
-                            if pygame.sprite.groupcollide(character, house, False, False):
-                                house_hold.add(spr)
-                                hold_left.empty()
-                                house_hold.empty()
-                                full_l = False  # open hand
-                                # remove fire
-                                count_fire = 0
-                                for f in fires:
-                                    if count_fire >= 1:
-                                        break
-                                    else:
-                                        fires.remove(f)
-                                    count_fire += 1
-                # save
-                elif event.key == buttons.get_save():
-                    save_game_database(mc.health, map_pos_x, map_pos_y, mc.get_position(), len(fires.sprites()))
-                    pass
-                # open
-                elif event.key == buttons.get_open():
-                    th, map_pos_x, map_pos_y, place, f = open_game_database()
-                    mc.health.reset_critical()
-                    mc.health.reset_broken()
-                    mc.health.open_health(th, 1135*5)
-                    mc.set_position(place[0], place[1])
-
-                    fires.empty()
-                    puddle.empty()
-                    for p in plants:
-                        n = str(p).split()
-                        if n[0] == 'puddle':
-                            plants.remove(p)
-                    progress(f, fires, puddle, fire_spread, view, background)
-                    plants.add(puddle)
-                    pass
-
-                elif event.key == buttons.get_volume_down():
-                    if music.get_volume() >= 0:
-                        music.set_volume(music.get_volume() - 0.1)
-                elif event.key == buttons.get_volume_up():
-                    if music.get_volume() <= 1:
-                        music.set_volume(music.get_volume() + 0.1)
-
-            if event.type == pygame.KEYUP:  # When keys are not pressed down
-                if event.key == buttons.get_up():  # up
-                    keys[0] = False            # resets the keys list when the button is not pressed
-                elif event.key == buttons.get_left():  # left
-                    keys[1] = False
-                elif event.key == buttons.get_down():  # down
-                    keys[2] = False
-                elif event.key == buttons.get_right():  # right
-                    keys[3] = False
+                            house_hold.empty()
+                            puddle_pool.put(spr)  # the puddle can be used again
+                            full_l = False  # open hand
+                            # remove fire
+                            count_fire = 0
+                            for f in fires:
+                                if count_fire >= 1:
+                                    break
+                                else:
+                                    fire_pool.put(f)
+                                count_fire += 1
+            # save
+            elif action == GPlay.SAVE:
+                save_game_database(mc.health, map_pos_x, map_pos_y, mc.get_position(), len(fires.sprites()))
+                pass
+            # open
+            elif action == GPlay.OPEN:
+                th, map_pos_x, map_pos_y, place, f = open_game_database()
+                mc.health.reset_critical()
+                mc.health.reset_broken()
+                mc.health.open_health(th, 1135*5)
+                mc.set_position(place[0], place[1])
+
+                for fire in fires.sprites():
+                    fire_pool.put(fire)
+                for p in puddle.sprites():
+                    puddle_pool.put(p)  # also takes it out of the plants
+                progress(f, fires, puddle, fire_spread, view, background, fire_pool, puddle_pool, placer)
+                plants.add(puddle)
+                pass
+
+            elif action == GPlay.VOLUME_DOWN and music is not None:
+                if music.get_volume() >= 0:
+                    music.set_volume(music.get_volume() - 0.1)
+            elif action == GPlay.VOLUME_UP and music is not None:
+                if music.get_volume() <= 1:
+                    music.set_volume(music.get_volume() + 0.1)
+
+            # show how long each part of a frame takes
+            elif action == GPlay.PROFILE:
+                show_profile = not show_profile
+                timer.set_enabled(show_profile or profiling)
+                profile_lines = None
 
         # move background
+        timer.mark('scroll')
         # prevent from moving off the screen, and move the background while limiting to the size of the background image
         # keeps the player in the boundaries of the background image
         if mc.get_position()[0] <= 0 + view.get_border():  # left
@@ -431,74 +641,72 @@ def main():
                 map_pos_y = background.get_position()[1] - mc.get_speed()
 
         # Update locations
+        last_pos = pos
         pos = [map_pos_x, map_pos_y]
-        world.update(pos)  # moves with the background
+        background.update(pos)  # moves with the background
+        timer.mark('update')
         plants.add(puddle)
-        plants.update(pos)
-        muddy.update(pos)
-        puddle.update(pos)
-        my_house.update(pos)
-        fires.update(pos)
+        near = view.get_cull_rect(pos)  # only what is near the window is moved and drawn
+        plants.update_visible(pos, near)
+        muddy.update_visible(pos, near)
+        puddle.update_visible(pos, near)
+        house.update_visible(pos, near)
+        fires.update_visible(pos, near)
+        if timer.get_enabled():
+            timer.count('sprites updated', len(plants.get_visible()) + len(muddy.get_visible()) +
+                        len(puddle.get_visible()) + len(house.get_visible()) + len(fires.get_visible()))
 
         # colliding
-        stop = Things.Group()
-        stop.add(pygame.sprite.groupcollide(character, muddy, False, False))
-        for spr in stop.sprites():
-            if 'Main Character' in str(spr):
-                special[4] = True
-        stop.empty()
+        timer.mark('collide')
+        mc_rect = Spatial.world_rect(mc.rect, pos)  # the main character on the background
+        if muddy.collide(mc_rect):
+            special[4] = True
 
         # running
-        if run is True:  # the timer
+        if effects.get_running():
             status += ' Running. '
             view.set_border(200)
-            run_timer += 1
-            if run_timer >= 60 * 2:  # 2 second
-                run = False
-                run_timer = 0
-        if run is False:
+        else:
             view.set_border(normal_border)
 
         # damage
-        if pygame.sprite.groupcollide(character, birds, False, False):
+        touching = foe_engine.collide(mc_rect)
+        if any(f in birds for f in touching):
             ouch_counter += 1
             if ouch_counter > 2:  # requires 2 consecutive hurtful seconds/60 in a row so not hurt when the game starts
                 ouch_counter = 0
                 bird_damage = True
 
-        if pygame.sprite.groupcollide(character, wolves, False, False):
+        if any(f in wolves for f in touching):
             ouch_counter += 1
             if ouch_counter > 2:  # so not hurt when the game starts
                 ouch_counter = 0
                 wolf_damage = True
 
-        if pygame.sprite.groupcollide(character, spiders, False, False):
+        if any(f in spiders for f in touching):
             ouch_counter += 1
             if ouch_counter > 3:  # so not hurt when the game starts
                 ouch_counter = 0
                 barrier = True
-                spider_damage = True
-
-        # Note: can't use the Timer class because need to reset critical inside what would be the internal code of Timer
-        if delay is True:  # the timer
-            ouch_flash_timer += 1
-            if ouch_flash_timer >= 20:  # 1/3 of a second
-                mc.health.reset_critical()  # reset the HUD
-                delay = False
-                ouch_flash_timer = 0
+                effects.bite()
 
+        timer.mark('health')
         if special[4] or special[1]:  # crippled: can't run
-            run = False
+            effects.stop_running()
+            scheduler.cancel('run over')
             status += ' Crippled. '
         if special[2]:
             status += ' Left Arm Numb. '
         if special[3]:
             status += ' Right Arm Numb. '
-        if poisoned:
+        if effects.get_poisoned():
             status += ' Poisoned. '
+        if special[0]:  # makes blind
+            status += ' Blind. '
 
-        # Time synced: damage, healing, eating
-        if s == 1:  # every second
+        # Time synced: damage, healing, eating. The only timer still looked for here instead of calling back,
+        # because it changes so many of the loop's variables. due is usually empty so it costs next to nothing
+        if 'second' in due:
             # damage  # remember, damage is negative!
             if bird_damage:
                 for b in birds:
@@ -509,21 +717,18 @@ def main():
                     damage = [0, 0, 0, 0, 0, False]  # resets so only damages one body segment at a time
                     damage = w.damage_high_random(damage)
                 wolf_damage = False
-            if spider_damage:
+            if effects.get_bitten():
                 for sp in spiders:
                     damage, poison_strength, ouch_counter = sp.poison_damage(strength=p_strength)
-                    poisoned = True
+                    effects.poison()
 
-            if poisoned:
-                poison_counter += 1
-            if poison_counter >= poison_time:
-                poison_counter = 0
-                spider_damage = False
-                poisoned = False
+            # the poison acts for poison_time seconds. Its timer is due the tick after its last second, so the
+            # damage of that second is still done however short the poison_time
+            if effects.get_poisoned() and not scheduler.is_scheduled('poison over'):
+                scheduler.schedule('poison over', (poison_time - 1) * TICKS_PER_SECOND + 1, callback=effects.cure)
 
-            if damage != [0, 0, 0, 0, 0, False]:  # start the timer
-                ouch_flash_timer = 0
-                delay = True
+            if damage != [0, 0, 0, 0, 0, False]:  # flash the damaged body segments on the HUD for 1/3 of a second
+                scheduler.schedule('flash over', TICKS_PER_SECOND / 3, callback=mc.health.reset_critical)
 
             # updating health
             mc.health.update(damage, healing, poison_strength=poison_strength)
@@ -531,165 +736,124 @@ def main():
             healing = [0, 0, 0, 0, 0]
 
             # eating food
-            foods = ['']
+            food = None
             for f in eat_right.sprites():
-                foods = str(f).split()
+                food = f.get_kind()
             for f in eat_left.sprites():
-                foods = str(f).split()
+                food = f.get_kind()
 
-            if foods[0] == eat.kinds_of_food()[0]:
+            if food == Things.KINDS_OF_FOOD[0]:
                 eat.fruit(mc)
-            if foods[0] == eat.kinds_of_food()[1]:
+            if food == Things.KINDS_OF_FOOD[1]:
                 eat.root(mc)
-            if foods[0] == eat.kinds_of_food()[2]:
+            if food == Things.KINDS_OF_FOOD[2]:
                 eat.grain(mc)
-            if foods[0] == eat.kinds_of_food()[3]:
+            if food == Things.KINDS_OF_FOOD[3]:
                 eat.vegetable(mc)
-            if foods[0] == eat.kinds_of_food()[4]:
+            if food == Things.KINDS_OF_FOOD[4]:
                 eat.meat(mc)
 
             eat_right.empty()  # resets the lists
             eat_left.empty()
 
         # Update MC and health
-        mc.update(keys, stopped=barrier, running=run)  # tell the main character to move with the keys
+        mc.update(keys, stopped=barrier, running=effects.get_running())  # tell the main character to move with the keys
         barrier = False  # resets the variable
-
-        # increase fire
-        if m == 1 and s == 1:  # once a minute
-            fire_timer += 1
-            if fire_timer >= 2:  # every 2 minutes
-                progress(1, fires, puddle, fire_spread, view, background)
-                fire_timer == 0
+        timer.count('sprites updated')
 
         # foe movement
-        pace = 0
-        for e in wolves:
-            e.shape_pace_horizontal(pos, sec=rand_pace[pace])
-            pace += 1
-        for e in birds:
-            e.shape_diamond(pos, sec=rand_pace[pace])
-            pace += 1
-        for e in spiders:
-            e.shape_square(pos, sec=rand_pace[pace])
-            pace += 1
-
-        # Draw Everything
-        world.draw(screen)
-        plants.draw(screen)
-        muddy.draw(screen)
-        puddle.draw(screen)
-        if special[0] is False:  # makes blind
-            foes.draw(screen)
-            character.draw(screen)
-        else:
-            status += ' Blind. '
-        house.draw(screen)
-        fires.draw(screen)
-
-        text = str(mc.health)
-        fires_text = 'Fires: ' + str(len(fires.sprites()))
-
-        display_text = font.render(text, 1, (10, 10, 10))  # with anti-aliasing in a dark gray color
-        display_progress = font.render(fires_text, 1, (10, 10, 10))
-        display_status = font.render(status, 1, (10, 10, 10))
-
-        text_hud.blit(display_text, display_text.get_rect())
-        progress_hud.blit(display_progress, display_progress.get_rect())
-        status_hud.blit(display_status, display_status.get_rect())
-
-        screen.blit(text_hud, text_position)
-        screen.blit(progress_hud, progress_position)
-        screen.blit(status_hud, status_position)
-
-        text_hud.fill(text_fill)
-        progress_hud.fill(text_fill)
-        status_hud.fill(text_fill)
-
-        # Draw the health bar
-        health_meter_green.draw(screen)
-        o, y, r = mc.health.create_hud()
-
-        if 0 in o:
-            health_head_meter_orange.draw(screen)
-        if 1 in o:
-            health_torso_meter_orange.draw(screen)
-        if 2 in o:
-            health_r_arm_meter_orange.draw(screen)
-        if 3 in o:
-            health_l_arm_meter_orange.draw(screen)
-        if 4 in o:
-            health_legs_meter_orange.draw(screen)
-
-        if 0 in y:
-            health_head_meter_yellow.draw(screen)
-        if 1 in y:
-            health_torso_meter_yellow.draw(screen)
-        if 2 in y:
-            health_r_arm_meter_yellow.draw(screen)
-        if 3 in y:
-            health_l_arm_meter_yellow.draw(screen)
-        if 4 in y:
-            health_legs_meter_yellow.draw(screen)
-
-        if 0 in r:
-            health_head_meter_red.draw(screen)
-        if 1 in r:
-            health_torso_meter_red.draw(screen)
-        if 2 in r:
-            health_r_arm_meter_red.draw(screen)
-        if 3 in r:
-            health_l_arm_meter_red.draw(screen)
-        if 4 in r:
-            health_legs_meter_red.draw(screen)
-
-        if hold_right:
-            hold_r.draw(screen)
-        if hold_left:
-            hold_l.draw(screen)
+        timer.mark('foes')
+        foe_engine.step(pos)
+        with timer.scope('foe culling'):
+            foes.show(foe_engine.get_near())
+        if timer.get_enabled():
+            timer.count('sprites updated', foe_engine.get_updated())
+            tested = sum(g.get_tested() for g in (plants, muddy, house, foes, foe_engine))
+            timer.count('collisions tested', tested - last_tested)
+            last_tested = tested
+
+        if recorder is not None and frame % TICKS_PER_SECOND == 0:  # once a second
+            recorder.check(Replay.world_state(frame, mc.health, [character, plants, foes, fires, puddle, muddy,
+                                                                 hold_right, hold_left]))
 
         # ending
         if len(fires.sprites()) == 0:
+            if headless:
+                return {'outcome': 'success', 'frames': frame, 'seed': seed}
             foes.empty()
             character.empty()
             ending.add(success)
-            d_count = 0
+            scheduler.clear()
+            scheduler.schedule('ending over', 5 * TICKS_PER_SECOND)  # 5 seconds
             while True:
-                clock.tick(60)
+                clock.tick(TICKS_PER_SECOND)
                 ending.draw(screen)
                 pygame.display.flip()
-                d_count += 1
-                if d_count >= 60 * 5:  # 5 seconds
-                    return
+                if 'ending over' in scheduler.advance():
+                    return {'outcome': 'success', 'frames': frame, 'seed': seed}
                 for event in pygame.event.get():  # closes the window earlier than the timer
                     if event.type == pygame.QUIT:
-                        return
+                        return {'outcome': 'success', 'frames': frame, 'seed': seed}
         elif len(fires.sprites()) >= 7:  # (7 - 4) * 2 = ends after 6 to 12 minutes of no progress
+                outcome = 'burned'
                 ending.add(failure)
                 ending.add(burned)
         elif mc.health.get_alive() is False:
+                outcome = 'died'
                 ending.add(failure)
                 ending.add(died)
         if len(ending.sprites()) != 0:
-                d_count = 0
+                if headless:
+                    return {'outcome': outcome, 'frames': frame, 'seed': seed}
+                scheduler.clear()
+                scheduler.schedule('ending over', 5 * TICKS_PER_SECOND)  # 5 seconds
                 while True:
-                    clock.tick(60)
+                    clock.tick(TICKS_PER_SECOND)
                     ending.draw(screen)
                     pygame.display.flip()
                     for event in pygame.event.get():
                         if event.type == pygame.QUIT:
-                            return
-                    d_count += 1
-                    if d_count >= 60 * 5:  # 5 seconds
-                        return
+                            return {'outcome': outcome, 'frames': frame, 'seed': seed}
+                    if 'ending over' in scheduler.advance():
+                        return {'outcome': outcome, 'frames': frame, 'seed': seed}
                         # end of game
 
-        # send everything to the screen
+        if not render_every:  # nothing is drawn so every tick is measured on its own
+            timer.end_frame()
+            timer.start_frame()
+
+
+def run_headless(frames=600, script=None, **settings):
+    """
+    Runs the game without a window, sound or keyboard using the SDL dummy drivers, such as for testing and balancing.
+    Must be called before anything else starts pygame's display.
+    :param frames: the number of ticks to run unless the game ends sooner
+    :param script: ScriptedInput object with the key presses. Nothing is pressed if None
+    :param settings: other keyword arguments passed to main
+    :return: the dictionary returned by main
+    """
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    return main(headless=True, script=script, max_frames=frames, **settings)
+
 
-        pygame.display.flip()
+def replay(file_name, **settings):
+    """
+    Plays a recording again without a window as fast as possible and checks the world is the same every second
+    :param file_name: path of a file written by Recorder.save
+    :param settings: other keyword arguments passed to main, such as a timer
+    :return: the dictionary returned by main with 'diverged' added, the first frame where the world was not the same
+        as when it was recorded or None if it was always the same
+    """
+    recording = Replay.Recording(file_name)
+    recorder = Replay.Recorder()
+    settings.update(recording.get_settings())
+    result = run_headless(frames=recording.get_frames(), script=recording.get_script(), recorder=recorder, **settings)
+    result['diverged'] = recording.compare(recorder.get_checks())
+    return result
 
 
-def progress(number, fires, puddle, fire_spread, view, background):
+def progress(number, fires, puddle, fire_spread, view, background, fire_pool=None, puddle_pool=None, placer=None):
     """
     Creates the fires and the puddles
     :param number: Amount of fires and puddles to be created
@@ -698,14 +862,29 @@ def progress(number, fires, puddle, fire_spread, view, background):
     :param fire_spread: The standard deviation for the random placement of the fire objects
     :param view: Boundary for the puddle objects
     :param background: Boundary for the puddle objects
+    :param fire_pool: Pool to take the fires from. New ones are made if None
+    :param puddle_pool: Pool to take the puddles from. New ones are made if None
+    :param placer: Spatial.Placer that keeps the puddles apart from the other things. They are put anywhere if None
     """
+    if number < 1:
+        return
+    rxs = Dice.normals('fire', 400, fire_spread, number)
+    rys = Dice.normals('fire', 100, fire_spread, number)
+    rand_puddles = rand_position(view, background, amount=number)
+    if placer is not None:
+        rand_puddles = placer.keep_apart(rand_puddles, image_radius("background\\puddle.png"),
+                                         functools.partial(rand_position, view, background))
     for f in range(number):
-        rx = random.normalvariate(400, fire_spread)
-        ry = random.normalvariate(100, fire_spread)
-        rand_fire = [rx, ry]
-        fires.add(Things.Item('fire', "background\\fire4.png", rand_fire))
+        rand_fire = [float(rxs[f]), float(rys[f])]
+        if fire_pool is None:
+            fires.add(Things.Item('fire', "background\\fire4.png", rand_fire, tag=Things.FIRE))
+        else:
+            fires.add(fire_pool.get(rand_fire))
         # add puddle
-        puddle.add(Things.Item("puddle", "background\\puddle.png", rand_position(view, background, amount=1)[0]))
+        if puddle_pool is None:
+            puddle.add(Things.Item("puddle", "background\\puddle.png", rand_puddles[f], tag=Things.PUDDLE))
+        else:
+            puddle.add(puddle_pool.get(rand_puddles[f]))
 
 
 def save_game_database(health, map_x, map_y, player_pos, containers):
@@ -724,9 +903,9 @@ def save_game_database(health, map_x, map_y, player_pos, containers):
     player_x = player_pos[0]
     player_y = player_pos[1]
 
-    with open("data\\save.sqlite", 'w'):
+    with open(GPlay.data_path('save.sqlite'), 'w'):
         # makes it recreate the file each time so the state can be saved many times while running
-        conn = sql.connect("data\\save.sqlite")
+        conn = sql.connect(GPlay.data_path('save.sqlite'))
         curs = conn.cursor()
         initialize = """ CREATE TABLE if not EXISTS save_game (health_head int, health_torso int, health_r_arm int,"""
         initialize += """health_l_arm int, health_legs int, map_x int, map_y int, player_x int, """
@@ -752,7 +931,7 @@ def open_game_database():
     player_pos: list of 2 integers to set the player position
     num_fires: integer used to randomly make fires
     """
-    conn = sql.connect("data\\save.sqlite")
+    conn = sql.connect(GPlay.data_path('save.sqlite'))
     curs = conn.cursor()
     curs.execute(""" SELECT * FROM save_game""")
     fetch = curs.fetchone()
@@ -776,4 +955,34 @@ def open_game_database():
 
 # Required to run as a program not import
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    # python MyGame.py [--headless [frames]] [--profile trace.json] [--seed number] [--record FILE | --replay FILE]
+    parser = argparse.ArgumentParser(description='Cabin Fever')
+    parser.add_argument('--headless', type=int, nargs='?', const=600, metavar='FRAMES',
+                        help='run without a window or sound for this many frames')
+    parser.add_argument('--profile', metavar='FILE', help='measure every frame and write a trace file when it ends')
+    parser.add_argument('--seed', type=int, help='seed for the random numbers, to play the same game again')
+    parser.add_argument('--record', metavar='FILE', help='record the key presses to play the game again')
+    parser.add_argument('--replay', metavar='FILE', help='play a recorded game again without a window')
+    parser.add_argument('--max-fps', type=int, default=60, help='the most frames drawn a second, 0 for no limit')
+    parser.add_argument('--interpolate', action='store_true', help='draw the scrolling between ticks')
+    parser.add_argument('--render-every', type=int, default=1, metavar='TICKS',
+                        help='without a window, draw a frame after this many ticks. 0 never draws')
+    args = parser.parse_args()
+    profiler = Profile.Profiler(enabled=args.profile is not None)
+    game_recorder = Replay.Recorder() if args.record is not None else None
+    if args.replay is not None:
+        result = replay(args.replay, timer=profiler, render_every=args.render_every)
+        print result['outcome'], result['frames'], 'seed', result['seed'],
+        print 'the same' if result['diverged'] is None else 'different from frame %d' % result['diverged']
+    elif args.headless is not None:
+        result = run_headless(frames=args.headless, timer=profiler, seed=args.seed, recorder=game_recorder,
+                              render_every=args.render_every)
+        print result['outcome'], result['frames'], 'seed', result['seed']
+    else:
+        result = main(timer=profiler, seed=args.seed, recorder=game_recorder, max_fps=args.max_fps,
+                      interpolate=args.interpolate)
+        print 'seed', result['seed']
+    if game_recorder is not None:
+        game_recorder.save(args.record)
+    if args.profile is not None:
+        profiler.dump(args.profile)
\ No newline at end of file
@@ -0,0 +1,208 @@
+__author__ = 'ElectroNick'
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import MyGame_game_play as GPlay
+import MyGame_objects as Things
+import MyGame_random as Dice
+
+if GPlay.numpy is None:
+    raise SystemExit('numpy is needed to run the balancing trials')
+numpy = GPlay.numpy
+
+# The settings of one configuration. The first three are the balancing variables in main, the rates stand in for
+# how often the player runs into things, which main gets from the sprites touching
+DEFAULTS = {
+    'p_strength': 55,  # strength of the spider's poison
+    'poison_time': 5,  # number of seconds the poison acts
+    'number_plants': 10,  # the number of each kind of plant
+    'bird_rate': 1.0,  # bird hits a minute
+    'wolf_rate': 1.0,  # wolf hits a minute
+    'spider_rate': 1.0,  # spider bites a minute
+    'find_rate': 0.05,  # plants found and eaten a minute for each plant left
+    'seconds': 600,  # the longest time a trial lasts
+}
+
+FOODS = ['fruit', 'root', 'grain', 'vegetable']  # each kind has 2 plants with number_plants of each in main
+
+
+def run_trials(job):
+    """
+    Plays many characters at once, one second at a time, with the same rules main uses every second:
+    bird and wolf damage, spider poison lasting poison_time seconds, Health.update and then eating one plant.
+    Used by the process pool so it must be at the top of the module.
+    :param job: tuple of the configuration dictionary, the number of trials and the seed
+    :return: dictionary of the 'died' and 'healed' arrays, the second each character died and the seconds it took to
+        heal back to its starting health after it was first hurt, or -1 if it did not happen
+    """
+    config, trials, seed = job
+    Dice.seed(seed)  # used by the Attacker, Eating and HealthBatch rules
+    chances = Dice.streams.batch('balance')  # chooses what happens each second
+
+    health = GPlay.HealthBatch(trials)
+    start = health.get_health().sum(axis=1)
+    bird = Things.Attacker()
+    wolf = Things.Attacker()
+    spider = Things.Attacker()
+    eat = Things.Eating()
+
+    spider_damage = numpy.zeros(trials, dtype=bool)
+    poisoned = numpy.zeros(trials, dtype=bool)
+    poison_counter = numpy.zeros(trials, dtype=numpy.int64)
+    plants = numpy.full((trials, len(FOODS)), 2 * config['number_plants'], dtype=numpy.int64)
+    find = config['find_rate'] / 60.0
+    died = numpy.full(trials, -1, dtype=numpy.int64)
+    hurt = numpy.full(trials, -1, dtype=numpy.int64)
+    healed = numpy.full(trials, -1, dtype=numpy.int64)
+    alive = health.get_alive()
+
+    for second in range(1, config['seconds'] + 1):
+        damage = numpy.zeros((trials, 5), dtype=numpy.int64)
+        chance = chances.random_sample((4, trials))
+        for i in numpy.flatnonzero(alive & (chance[0] < config['bird_rate'] / 60.0)):
+            damage[i] = bird.damage_high_accurate([0, 0, 0, 0, 0, False], 0)[:5]
+        for i in numpy.flatnonzero(alive & (chance[1] < config['wolf_rate'] / 60.0)):
+            damage[i] = wolf.damage_high_random([0, 0, 0, 0, 0, False])[:5]  # replaces the bird's damage as in main
+        spider_damage |= alive & (chance[2] < config['spider_rate'] / 60.0)
+        poison = spider_damage.copy()
+        damage[poison] = spider.poison_damage(config['p_strength'])[0][:5]  # replaces the other damage as in main
+        poisoned |= poison
+        poison_counter += poisoned
+        over = poison_counter >= config['poison_time']
+        poison_counter[over] = 0
+        spider_damage[over] = False
+        poisoned[over] = False
+        health.update(damage, None, poison_strength=config['p_strength'], poisoned=poison)
+
+        # eating at most one plant a second
+        left = plants.sum(axis=1)
+        found = numpy.flatnonzero(alive & (left > 0) & (chance[3] < 1 - (1 - find) ** left))
+        if len(found):
+            first = numpy.zeros((trials, 5), dtype=numpy.int64)
+            second_healing = numpy.zeros((trials, 5), dtype=numpy.int64)
+            for i in found:
+                kind = numpy.searchsorted(numpy.cumsum(plants[i]), Dice.stream('food').randint(1, left[i]))
+                plants[i, kind] -= 1
+                heal_lists = eat.heal_lists(FOODS[kind])
+                first[i] = heal_lists[0]
+                if len(heal_lists) > 1:
+                    second_healing[i] = heal_lists[1]
+            health.apply(healing=first)
+            health.apply(healing=second_healing)
+
+        alive = health.get_alive()
+        total = health.get_health().sum(axis=1)
+        died[(died < 0) & ~alive] = second
+        hurt[(hurt < 0) & (total < start)] = second
+        done = (hurt >= 0) & (healed < 0) & alive & (total >= start)
+        healed[done] = second - hurt[done]
+        if not alive.any():
+            break
+    return {'died': died, 'healed': healed}
+
+
+def describe(seconds, trials):
+    """
+    :param seconds: array of seconds, -1 where it did not happen
+    :param trials: the number of trials
+    :return: dictionary of the fraction of trials where it happened, and the mean, 5th, 25th, 50th, 75th and 95th
+        percentiles and a histogram of the seconds in 30 second bins
+    """
+    happened = seconds[seconds >= 0]
+    result = {'fraction': len(happened) / float(trials) if trials else 0.0}
+    if len(happened):
+        result['mean'] = float(happened.mean())
+        for p in (5, 25, 50, 75, 95):
+            result['p%d' % p] = float(numpy.percentile(happened, p))
+        counts, edges = numpy.histogram(happened, bins=numpy.arange(0, happened.max() + 31, 30))
+        result['histogram'] = [[int(edge), int(count)] for edge, count in zip(edges, counts)]
+    return result
+
+
+def simulate(config, trials=10000, seed=0, chunk=5000, pool=None):
+    """
+    Runs the trials of one configuration in chunks, each with its own seed so the results do not depend on how
+    many processes there are
+    :param config: dictionary of settings like DEFAULTS
+    :param trials: the number of characters to play
+    :param seed: seed for the random numbers
+    :param chunk: the most trials played at once by one process
+    :param pool: multiprocessing Pool to run the chunks in. Run one at a time if None
+    :return: dictionary of the configuration and the description of the time to die and the time to heal
+    """
+    jobs = []
+    for first in range(0, trials, chunk):
+        jobs.append((config, min(chunk, trials - first), (seed * 1000003 + first) % 2 ** 32))
+    if pool is None:
+        results = map(run_trials, jobs)
+    else:
+        results = pool.map(run_trials, jobs)
+    died = numpy.concatenate([r['died'] for r in results])
+    healed = numpy.concatenate([r['healed'] for r in results])
+    return {'config': config, 'trials': trials, 'seed': seed,
+            'time_to_death': describe(died, trials), 'time_to_heal': describe(healed, trials)}
+
+
+def configurations(sweep):
+    """
+    :param sweep: dictionary of setting name: list of values to try
+    :return: list of configuration dictionaries, one for every combination of the values
+    """
+    names = sorted(sweep)
+    configs = []
+    for values in itertools.product(*[sweep[name] for name in names]):
+        config = dict(DEFAULTS)
+        config.update(zip(names, values))
+        configs.append(config)
+    return configs
+
+
+def report(result):
+    """
+    Prints one line for each configuration
+    :param result: dictionary returned by simulate
+    """
+    c = result['config']
+    line = 'p_strength %2d  poison_time %2d  plants %3d:' % (c['p_strength'], c['poison_time'], c['number_plants'])
+    for name in ('time_to_death', 'time_to_heal'):
+        d = result[name]
+        line += '  %s %5.1f%%' % (name.replace('_', ' '), d['fraction'] * 100)
+        if 'p50' in d:
+            line += ' (median %5.0f s, 5%%-95%% %4.0f-%4.0f s)' % (d['p50'], d['p5'], d['p95'])
+    print line
+
+
+def main():
+    """
+    Runs the trials for every combination of the settings given, prints the results and writes them to a JSON file
+    """
+    parser = argparse.ArgumentParser(description='Monte-Carlo trials of the damage, poison and healing rules')
+    parser.add_argument('--trials', type=int, default=100000, help='characters played for each configuration')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random numbers')
+    parser.add_argument('--processes', type=int, default=None, help='processes in the pool. All the CPUs if not set')
+    parser.add_argument('--chunk', type=int, default=5000, help='trials played at once by one process')
+    for name, value in sorted(DEFAULTS.items()):
+        parser.add_argument('--' + name.replace('_', '-'), type=type(value), nargs='+', default=[value])
+    parser.add_argument('--output', default='balance.json', help='file to write the results to')
+    args = parser.parse_args()
+
+    sweep = dict((name, getattr(args, name)) for name in DEFAULTS)
+    pool = multiprocessing.Pool(args.processes)
+    results = []
+    try:
+        for config in configurations(sweep):
+            result = simulate(config, trials=args.trials, seed=args.seed, chunk=args.chunk, pool=pool)
+            report(result)
+            results.append(result)
+    finally:
+        pool.close()
+        pool.join()
+    with open(args.output, 'w') as out:
+        json.dump(results, out, indent=1, sort_keys=True)
+
+
+# Required to run as a program not import
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+__author__ = 'ElectroNick'
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+import pygame
+import MyGame as Game
+import MyGame_game_play as GPlay
+import MyGame_profile as Profile
+
+SCALES = [1, 10, 100]  # multiples of the normal 7 foes of each kind and 10 plants of each kind
+
+
+def walk_script(frames):
+    """
+    Makes a script that walks the main character around in a square, running, picking things up and eating
+    :param frames: the number of frames the script lasts
+    :return: ScriptedInput object
+    """
+    buttons = GPlay.Buttons()
+    buttons.set_move_buttons()  # the same buttons main uses
+    moves = [buttons.get_right(), buttons.get_down(), buttons.get_left(), buttons.get_up()]
+    script = GPlay.ScriptedInput()
+    side = 0
+    for start in range(1, frames + 1, 240):  # a new side of the square every 4 seconds
+        script.hold(start, moves[side % 4], 200)
+        script.hold(start + 50, buttons.get_run())
+        script.hold(start + 100, buttons.get_pickup_right())
+        script.hold(start + 101, buttons.get_eat_right())
+        script.hold(start + 150, buttons.get_pickup_left())
+        script.hold(start + 151, buttons.get_eat_left())
+        side += 1
+    return script
+
+
+def run(scale, frames=600, seed=0, dirty_rects=False, recording=None):
+    """
+    Runs the game without a window and measures each phase of every frame
+    :param scale: multiple of the normal number of foes and plants
+    :param frames: the number of frames to run unless the game ends sooner
+    :param seed: seed for the random numbers so every run has the same world
+    :param dirty_rects: passed to main
+    :param recording: path of a recorded game to play instead of walking around. Its own settings and seed are used
+    :return: dictionary of the results from Profiler.results and the settings used
+    """
+    GPlay.image_cache.clear()  # so loading the images is measured every time
+    timer = Profile.Profiler(enabled=True)
+    start = time.time()
+    if recording is None:
+        result = Game.run_headless(frames=frames, script=walk_script(frames), number_foes=7 * scale,
+                                   number_plants=10 * scale, timer=timer, dirty_rects=dirty_rects, seed=seed)
+    else:
+        result = Game.replay(recording, timer=timer, dirty_rects=dirty_rects)
+    wall = time.time() - start
+    results = timer.results()
+    results.update({'scale': scale, 'seed': result['seed'], 'dirty_rects': dirty_rects, 'outcome': result['outcome'],
+                    'wall': wall, 'fps': results['frames'] / results['frame']['total'] if results['frames'] else 0.0})
+    if recording is not None:
+        results.update({'recording': recording, 'diverged': result['diverged']})
+    return results
+
+
+def commit():
+    """
+    :return: the git commit being measured, or None if it is not known
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD']).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(runs):
+    """
+    Prints a table of the mean and 95th percentile milliseconds of each phase for each run
+    :param runs: list of dictionaries returned by run
+    """
+    for r in runs:
+        print 'scale %d: %d frames (%s), %.0f frames per second, setup %.2f s' % (r['scale'], r['frames'],
+                                                                                 r['outcome'], r['fps'], r['setup'])
+        if r.get('recording') is not None and r['diverged'] is not None:
+            print '    the replay of %s was different from frame %d' % (r['recording'], r['diverged'])
+        for phase in r['order'] + ['frame']:
+            times = r['frame'] if phase == 'frame' else r['phases'][phase]
+            print '    %-18s mean %8.3f ms   p95 %8.3f ms' % (phase, times['mean'] * 1000, times['p95'] * 1000)
+        for name in sorted(r['counters']):
+            print '    %-18s mean %8.1f a frame' % (name, r['counters'][name]['mean'])
+
+
+def compare(old, new):
+    """
+    Prints how much the mean milliseconds of each phase and the counters changed between two result files
+    :param old: dictionary loaded from an earlier result file
+    :param new: dictionary of the new results
+    """
+    print 'compared with', old.get('commit')
+    for r in new['runs']:
+        before = [o for o in old['runs'] if o['scale'] == r['scale']]
+        if not before:
+            continue
+        print 'scale %d:' % r['scale']
+        for line in Profile.compare(before[0], r):
+            print '    ' + line
+
+
+def main():
+    """
+    Runs the benchmark for each scale, prints the results and writes them to a JSON file
+    """
+    parser = argparse.ArgumentParser(description='Measures where the time of each frame goes')
+    parser.add_argument('--frames', type=int, default=600, help='frames to run at each scale')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random numbers')
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES, help='multiples of the normal foes and plants')
+    parser.add_argument('--dirty-rects', action='store_true', help='only redraw what changed')
+    parser.add_argument('--output', default='benchmark.json', help='file to write the results to')
+    parser.add_argument('--compare', help='earlier result file to compare with')
+    parser.add_argument('--replay', metavar='FILE', help='play a recorded game instead, with its own settings')
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        runs = [run(1, dirty_rects=args.dirty_rects, recording=args.replay)]
+    else:
+        runs = [run(scale, frames=args.frames, seed=args.seed, dirty_rects=args.dirty_rects) for scale in args.scales]
+    results = {'commit': commit(), 'python': platform.python_version(), 'pygame': pygame.version.ver,
+               'platform': platform.platform(), 'runs': runs}
+    report(runs)
+    with open(args.output, 'w') as out:
+        json.dump(results, out, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+# Required to run as a program not import
+if __name__ == '__main__':
+    main()
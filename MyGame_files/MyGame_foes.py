@@ -0,0 +1,250 @@
+__author__ = 'ElectroNick'
+
+import MyGame_world as World
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Movement patterns, in the same order as the Foe functions in PATTERN_MOVES
+STAND_STILL = 0
+SQUARE = 1
+DIAMOND = 2
+PACE_HORIZONTAL = 3
+PACE_VERTICAL = 4
+
+PATTERN_MOVES = ['stand_still', 'shape_square', 'shape_diamond', 'shape_pace_horizontal', 'shape_pace_vertical']
+
+# The x, y direction each pattern sets for each value of Foe.count. None keeps the direction it already had.
+# Foe.count can reach 4 for one frame before Foe.move resets it, so there are five columns.
+PATTERN_DIRECTIONS = [
+    [(0, 0), (0, 0), (0, 0), (0, 0), (0, 0)],  # stand still
+    [(0, -1), (1, 0), (0, 1), (-1, 0), None],  # square: up, right, down, left
+    [(1, -1), (1, 1), (-1, 1), (-1, -1), None],  # diamond: up right, down right, down left, up left
+    [(1, 0), None, (-1, 0), None, None],  # pace horizontal: right, left
+    [(0, -1), None, (0, 1), None, None],  # pace vertical: up, down
+]
+
+
+def direction_keys(dx, dy):
+    """
+    :param dx: -1 for left, 1 for right or 0
+    :param dy: -1 for up, 1 for down or 0
+    :return: the list of key presses that moves in the direction
+    """
+    return [dy < 0, dx < 0, dy > 0, dx > 0]
+
+
+class FoeEngine(object):
+    """
+    The pattern and collision systems of the foes. Moves every foe at once and finds the ones touching a rectangle.
+    Each foe is an entity in a World with its position, speed, direction, size, pattern and the Foe turn and count
+    variables as components, so one step moves all of them in the same way the Foe shape functions do.
+    Only the foes near the window have their sprites updated, the rest only change in the world until they come near.
+    """
+    def __init__(self, view, margin=None):
+        """
+        Initializes the engine without any foes
+        :param view: Viewer object for the size of the window
+        :param margin: how far outside the window in pixels a foe's sprite is still updated. Must be more than half the
+            size of the largest foe so the foes partly in the window are updated. Uses the view's margin if None
+        """
+        self.__view = view
+        self.__margin = margin
+        self.__world = World.World()
+        self.__foes = []
+        self.__rows = {}  # foe: its row in the world
+        self.__placed = []  # the rows of the foes added since the last step, which are updated whether near or not
+        self.__updated = 0
+        self.__near = []  # the foes near the window after the last step
+        self.__tested = 0
+        if numpy is not None:
+            self.__directions = numpy.zeros((len(PATTERN_MOVES), 5, 2), dtype=numpy.int64)
+            self.__keep = numpy.zeros((len(PATTERN_MOVES), 5), dtype=bool)
+            for p, row in enumerate(PATTERN_DIRECTIONS):
+                for c, d in enumerate(row):
+                    if d is None:
+                        self.__keep[p, c] = True
+                    else:
+                        self.__directions[p, c] = d
+
+    def add(self, foe, pattern, sec=60):
+        """
+        Adds a foe to be moved with a pattern
+        :param foe: Foe object
+        :param pattern: one of the movement patterns such as SQUARE
+        :param sec: how long it should take the sprite to complete one loop of movement
+        """
+        if pattern == STAND_STILL:
+            sec = 60  # Foe.stand_still always uses the default
+        x, y = foe.get_position()
+        w, h = foe.get_largest_size()
+        row = self.__world.spawn(foe, x=x, y=y, speed=foe.get_speed(), w=w, h=h, pattern=pattern,
+                                 sec=max(sec, 0),  # Foe.move does not allow negative numbers
+                                 dx=-1 if foe.keys[1] else int(foe.keys[3]),  # left wins, as in Animal.update
+                                 dy=-1 if foe.keys[0] else int(foe.keys[2]),  # up wins
+                                 turn=foe.turn, count=foe.count)
+        self.__foes.append(foe)
+        self.__rows[foe] = row
+        self.__placed.append(row)  # every sprite is placed the first time so none is left where it was made
+
+    def get_foes(self):
+        """
+        :return: The list of foes in the order they were added
+        """
+        return self.__foes
+
+    def collide(self, rect):
+        """
+        Finds the foes touching the rectangle. The world's collision system finds the foes that could touch it, then
+        only their sprites are compared. Works for the foes near the window, whose sprites are where their rows are.
+        :param rect: rectangle in background coordinates
+        :return: list of the foes in the order they were added
+        """
+        world = self.__world
+        rows = world.touching(rect)
+        self.__tested += len(rows)
+        return [world.get_sprite(row) for row in rows if rect.colliderect(world.get_sprite(row).get_world_rect())]
+
+    def get_tested(self):
+        """
+        :return: The integer number of foe rectangles compared by collide since the engine was made
+        """
+        return self.__tested
+
+    def get_near(self):
+        """
+        :return: list of the foes near the window after the last step in the order they were added. Unlike the sprites
+            left behind by the foes that moved away, their sprites are where the foes are
+        """
+        return self.__near
+
+    def get_updated(self):
+        """
+        :return: The number of foe sprites updated by the last step
+        """
+        return self.__updated
+
+    def __len__(self):
+        """
+        :return: The number of foes
+        """
+        return len(self.__foes)
+
+    def step(self, background_position):
+        """
+        Moves every foe one frame along its pattern. Called every second/60.
+        :param background_position: current background position coordinates so the foes move with it
+        """
+        self.__updated = 0
+        if not self.__foes:
+            return
+        world = self.__world
+        if numpy is None:
+            moved = self.__step_lists(world)
+        else:
+            moved = self.__step_arrays(world)
+
+        # only the sprites near the window are updated
+        width, height = self.__view.get_screen_size()
+        margin = self.__margin
+        if margin is None:
+            margin = self.__view.get_margin()
+        updated = world.near(background_position, width, height, margin)
+        self.__near = [world.get_sprite(row) for row in updated]
+        if self.__placed:
+            updated = sorted(set(updated).union(self.__placed))
+            self.__placed = []
+        self.__write(updated, moved, background_position)
+        self.__updated = len(updated)
+
+    def __step_arrays(self, world):
+        """
+        Moves every foe with numpy
+        :return: the x and the y direction each row moved in
+        """
+        turn = world.column('turn')
+        count = world.column('count')
+
+        # Foe.move
+        turn[turn >= world.column('sec')] = 0
+        count[count > 3] = 0
+        moved_dx = world.column('dx').copy()  # the direction of this frame is the one chosen at the end of the last one
+        moved_dy = world.column('dy').copy()
+        world.move()
+        count += turn == 1
+        turn += 1
+
+        # the shape functions choose the direction for the next frame
+        pattern = world.column('pattern')
+        keep = self.__keep[pattern, count]
+        chosen = self.__directions[pattern, count]
+        world.set_column('dx', numpy.where(keep, moved_dx, chosen[:, 0]))
+        world.set_column('dy', numpy.where(keep, moved_dy, chosen[:, 1]))
+        return moved_dx, moved_dy
+
+    def __step_lists(self, world):
+        """
+        Moves every foe one at a time without numpy
+        :return: the x and the y direction each row moved in
+        """
+        turn = world.column('turn')
+        count = world.column('count')
+        sec = world.column('sec')
+        size = world.get_size()
+        for row in xrange(size):
+            if turn[row] >= sec[row]:
+                turn[row] = 0
+            if count[row] > 3:
+                count[row] = 0
+        moved_dx = world.column('dx')[:size]
+        moved_dy = world.column('dy')[:size]
+        world.move()
+
+        dx = world.column('dx')
+        dy = world.column('dy')
+        pattern = world.column('pattern')
+        for row in xrange(size):
+            if turn[row] == 1:
+                count[row] += 1
+            turn[row] += 1
+            chosen = PATTERN_DIRECTIONS[pattern[row]][count[row]]
+            if chosen is not None:
+                dx[row], dy[row] = chosen
+        return moved_dx, moved_dy
+
+    def __write(self, rows, moved, background_position):
+        """
+        Copies the world back into the foes' sprites
+        :param rows: list of the rows of the foes in the world
+        :param moved: the x and the y direction each row moved in this frame
+        :param background_position: current background position coordinates
+        """
+        world = self.__world
+        moved_dx, moved_dy = moved
+        for row, dx, dy, turn, count, x, y in zip(rows, world.gather('dx', rows), world.gather('dy', rows),
+                                                  world.gather('turn', rows), world.gather('count', rows),
+                                                  world.gather('x', rows), world.gather('y', rows)):
+            foe = world.get_sprite(row)
+            foe.change_direction(direction_keys(int(moved_dx[row]), int(moved_dy[row])))  # faces the way it moved
+            foe.keys = direction_keys(dx, dy)
+            foe.turn = turn
+            foe.count = count
+            foe.place(x, y, background_position)
+
+    def sync(self, background_position=None):
+        """
+        Copies the world back into every foe, such as before the foes are used outside the engine
+        :param background_position: current background position coordinates. Uses each foe's last one if None
+        """
+        world = self.__world
+        for foe in self.__foes:
+            row = self.__rows[foe]
+            position = background_position
+            if position is None:
+                position = list(foe.get_background_position())
+            foe.keys = direction_keys(world.get('dx', row), world.get('dy', row))
+            foe.turn = world.get('turn', row)
+            foe.count = world.get('count', row)
+            foe.place(world.get('x', row), world.get('y', row), position)
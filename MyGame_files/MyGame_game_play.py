@@ -1,9 +1,17 @@
 __author__ = 'ElectroNick'
 
 import os
+import array
+import collections
 import pygame
-import random
+import MyGame_random as Dice
+import string
 from pygame.locals import *
+try:
+    import numpy
+except ImportError:
+    numpy = None
+    print 'Warning, numpy not found, the health in a HealthBatch is updated one at a time'
 if not pygame.font:
     print 'Warning, fonts disabled'
 if not pygame.mixer:
@@ -12,50 +20,332 @@ if not pygame.mixer:
 # Resource handling classes
 
 
+def data_path(name):
+    """
+    :param name: File name inside the data directory using either slash
+    :return: The full path to the file for this operating system
+    """
+    return os.path.join('data', *name.replace('\\', '/').split('/'))
+
+
+class LRUCache(object):
+    """
+    Keeps the values made for keys so each value is only made once.
+    When more than the max size of values are held the least recently used value is dropped.
+    The caches of the game inherit from it and only say how their keys and values are made, see ImageCache.
+    """
+    name = 'Values'  # what the values are called by __str__
+
+    def __init__(self, max_size=100):
+        """
+        Initializes the empty cache
+        :param max_size: the largest number of distinct values kept at once
+        """
+        self.__values = collections.OrderedDict()  # key: value, ordered from least to most recently used
+        self.__max_size = 1
+        self.set_max_size(max_size)
+        self.__hits = 0
+        self.__misses = 0
+
+    def fetch(self, key, make, *args):
+        """
+        Returns the value kept for the key, making it only if it is not already in the cache
+        :param key: hashable key of the value
+        :param make: function making the value from the args. It must not return None
+        :param args: the arguments of make
+        :return: the shared value
+        """
+        value = self.__values.pop(key, None)
+        if value is None:
+            self.__misses += 1
+            value = make(*args)
+            if len(self.__values) >= self.__max_size:
+                self.__values.popitem(last=False)  # forget the least recently used value
+        else:
+            self.__hits += 1
+        self.__values[key] = value  # now the most recently used
+        return value
+
+    def clear(self):
+        """
+        Forgets every value, such as when the display mode is changed
+        """
+        self.__values.clear()
+
+    def get_hits(self):
+        """
+        :return: The number of times a value was found in the cache
+        """
+        return self.__hits
+
+    def get_misses(self):
+        """
+        :return: The number of times a value had to be made
+        """
+        return self.__misses
+
+    def get_size(self):
+        """
+        :return: The number of values currently in the cache
+        """
+        return len(self.__values)
+
+    def get_max_size(self):
+        """
+        :return: The largest number of values kept at once
+        """
+        return self.__max_size
+
+    def set_max_size(self, max_size):
+        """
+        Sets the largest number of values kept at once, dropping the least recently used values if over it
+        :param max_size: Must be a positive integer.
+        """
+        if max_size >= 1:
+            self.__max_size = max_size
+            while len(self.__values) > self.__max_size:
+                self.__values.popitem(last=False)
+
+    def __str__(self):
+        """
+        :return: A string providing the size of the cache and how often it was used
+        """
+        spacer = '   '
+        r = self.name + ': ' + str(self.get_size()) + '/' + str(self.get_max_size())
+        r += spacer + 'Hits: ' + str(self.get_hits()) + spacer + 'Misses: ' + str(self.get_misses())
+        return r
+
+
+class ImageCache(LRUCache):
+    """
+    Keeps the converted images so each picture is only loaded from the disk once no matter how many sprites use it.
+    The sprites share the image but each one is given its own rectangle.
+    When more than the max size of images are held the least recently used image is dropped.
+    """
+    name = 'Images'
+
+    def __init__(self, max_size=100):
+        """
+        Initializes the empty cache
+        :param max_size: the largest number of distinct images kept at once
+        """
+        LRUCache.__init__(self, max_size)
+        self.__paths = {}  # file name: path, so making many sprites at once does not build the same path every time
+
+    def get(self, name, color_key=None):
+        """
+        Returns the shared image for the file, loading it only if it is not already in the cache
+        :param name: File name. Assumed to be in the data directory.
+        :param color_key: sets transparent color. Set to color in upper left corner if set to -1
+        :return: the image and a new rectangle for it
+        """
+        if color_key is not None and color_key is not -1:
+            color_key = tuple(color_key)  # so lists and colors can be used in the key
+        path = self.__paths.get(name)
+        if path is None:
+            path = self.__paths[name] = data_path(name)
+        image = self.fetch((path, color_key), self.__load, path, color_key)
+        return image, image.get_rect()
+
+    @staticmethod
+    def __load(fullname, color_key):
+        """
+        Taken from http://www.pygame.org/docs/tut/chimp/ChimpLineByLine.html
+        :param fullname: Path to the file
+        :param color_key: sets transparent color. Set to color in upper left corner if set to -1
+        :return: the converted image
+        """
+        try:
+            image = pygame.image.load(fullname)
+        except pygame.error, message:
+            print 'Cannot load image:', fullname
+            raise SystemExit(message)
+        image = image.convert()
+        if color_key is not None:
+            if color_key is -1:
+                color_key = image.get_at((0, 0))
+            image.set_colorkey(color_key, RLEACCEL)
+        return image
+
+
+image_cache = ImageCache()  # shared by every sprite in the game
+
+
+class TextCache(LRUCache):
+    """
+    Keeps the pictures of text rendered by a font so the same text is only rendered once.
+    When more than the max size of pictures are held the least recently used picture is dropped.
+    """
+    name = 'Texts'
+
+    def __init__(self, max_size=200):
+        """
+        Initializes the empty cache
+        :param max_size: the largest number of distinct pictures kept at once
+        """
+        LRUCache.__init__(self, max_size)
+
+    def render(self, font, text, color, antialias=True):
+        """
+        Returns the shared picture of the text, rendering it only if it is not already in the cache
+        :param font: pygame Font object
+        :param text: the string to render
+        :param color: color of the text
+        :param antialias: smooths the edges of the text when True
+        :return: the picture of the text, which must not be changed
+        """
+        return self.fetch((font, text, tuple(color), antialias), font.render, text, antialias, color)
+
+
+text_cache = TextCache()  # shared by all the text on the screen
+
+
+class GlyphAtlas(object):
+    """
+    Holds one picture of every character in a font and color, and draws text by copying the characters out of it,
+    so text that changes often, such as numbers, is never rendered by the font again.
+    The characters are placed side by side without kerning so the spacing can differ slightly from Font.render.
+    Must be made after the display is set.
+    """
+    def __init__(self, font, color, characters=None, antialias=True):
+        """
+        Renders every character into the atlas
+        :param font: pygame Font object
+        :param color: color of the text
+        :param characters: string of the characters to hold. Letters, digits, punctuation and space if None.
+            Other characters are rendered with the text_cache when they are drawn
+        :param antialias: smooths the edges of the text when True
+        """
+        if characters is None:
+            characters = string.digits + string.ascii_letters + string.punctuation + ' '
+        self.__font = font
+        self.__color = color
+        self.__antialias = antialias
+        glyphs = []
+        for c in characters:
+            if c not in [g[0] for g in glyphs]:
+                glyphs.append((c, font.render(c, antialias, color).convert_alpha()))
+        width = sum(g[1].get_width() for g in glyphs)
+        height = max([g[1].get_height() for g in glyphs] + [font.get_height()])
+        self.__atlas = pygame.Surface((max(width, 1), height), SRCALPHA, 32)
+        self.__atlas.fill((0, 0, 0, 0))
+        self.__rects = {}  # character: its rectangle in the atlas
+        x = 0
+        for c, glyph in glyphs:
+            self.__atlas.blit(glyph, (x, 0), special_flags=BLEND_RGBA_MAX)  # copies the transparency too
+            self.__rects[c] = pygame.Rect(x, 0, glyph.get_width(), glyph.get_height())
+            x += glyph.get_width()
+
+    def get_height(self):
+        """
+        :return: The height of the text in pixels
+        """
+        return self.__atlas.get_height()
+
+    def size(self, text):
+        """
+        :param text: a string
+        :return: the width and height in pixels the text is drawn with
+        """
+        width = 0
+        for c in text:
+            rect = self.__rects.get(c)
+            if rect is None:
+                width += text_cache.render(self.__font, c, self.__color, self.__antialias).get_width()
+            else:
+                width += rect.width
+        return width, self.get_height()
+
+    def draw(self, surface, text, position):
+        """
+        Draws the text one character at a time
+        :param surface: the surface to draw on
+        :param text: a string
+        :param position: the x, y coordinates of the top left corner of the text
+        :return: the width of the text in pixels
+        """
+        x, y = position
+        blit = surface.blit
+        atlas = self.__atlas
+        rects = self.__rects
+        for c in text:
+            rect = rects.get(c)
+            if rect is None:
+                glyph = text_cache.render(self.__font, c, self.__color, self.__antialias)
+                blit(glyph, (x, y))
+                x += glyph.get_width()
+            else:
+                blit(atlas, (x, y), rect)
+                x += rect.width
+        return x - position[0]
+
+
 def load_image(name, color_key=None):
     """
-    Taken from http://www.pygame.org/docs/tut/chimp/ChimpLineByLine.html
+    Returns the image from the shared image cache, so each file is only loaded once
     :param name: File name. Assumed to be in the data directory.
-    :param color_key: sets transparent color. Set to color in upper left corner if set to None
+    :param color_key: sets transparent color. Set to color in upper left corner if set to -1
     :return: the image and its rectangular coordinates
     """
-    fullname = os.path.join('data', name)
-    try:
-        image = pygame.image.load(fullname)
-    except pygame.error, message:
-        print 'Cannot load image:', fullname
-        raise SystemExit(message)
-    image = image.convert()
-    if color_key is not None:
-        if color_key is -1:
-            color_key = image.get_at((0, 0))
-        image.set_colorkey(color_key, RLEACCEL)
-    return image, image.get_rect()
+    return image_cache.get(name, color_key)
 
 
 # Basic game play functions
+
+# What the buttons do. The four directions are numbered in the order of the keys list the main character moves with
+GO_UP = 0
+GO_LEFT = 1
+GO_DOWN = 2
+GO_RIGHT = 3
+RUN = 4
+PICKUP_RIGHT = 5
+PICKUP_LEFT = 6
+EAT_RIGHT = 7
+EAT_LEFT = 8
+SAVE = 9
+OPEN = 10
+VOLUME_DOWN = 11
+VOLUME_UP = 12
+PROFILE = 13
+MOVES = [GO_UP, GO_LEFT, GO_DOWN, GO_RIGHT]
+ACTIONS = range(14)
+
+
 class Buttons(object):
     """
     Sets what each button does
     The default for the set_move_buttons function is the w, a, s, d key format
+    The buttons are kept in a table from each key to what it does, so handling a key press is one look up and
+    changing a button is only changing the table.
     """
     def __init__(self):
         """
         Initializes all the keys used in the game with defaults
         """
-        self.__up = K_UP
-        self.__down = K_DOWN
-        self.__right = K_RIGHT
-        self.__left = K_LEFT
-        self.__run = K_SPACE
-        self.__pick_up_R = K_v
-        self.__pick_up_L = K_z
-        self.__eat_R = self.__pick_up_R
-        self.__eat_L = self.__pick_up_L
-        self.__save = K_F1
-        self.__open = K_F2
-        self.__volume_down = pygame.K_LEFTBRACKET
-        self.__volume_up = pygame.K_RIGHTBRACKET
+        self.__keys = {GO_UP: K_UP, GO_DOWN: K_DOWN, GO_RIGHT: K_RIGHT, GO_LEFT: K_LEFT, RUN: K_SPACE,
+                       PICKUP_RIGHT: K_v, PICKUP_LEFT: K_z, EAT_RIGHT: K_v, EAT_LEFT: K_z, SAVE: K_F1, OPEN: K_F2,
+                       VOLUME_DOWN: pygame.K_LEFTBRACKET, VOLUME_UP: pygame.K_RIGHTBRACKET, PROFILE: K_F3}
+        self.__actions = {}  # key: tuple of what it does, made by __compile
+        self.__compile()
+
+    def __compile(self):
+        """
+        Makes the table from each key to what it does.
+        A key can do more than one thing, such as picking up and eating, in the order of ACTIONS.
+        """
+        actions = {}
+        for action in ACTIONS:
+            actions.setdefault(self.__keys[action], []).append(action)
+        self.__actions = dict((key, tuple(a)) for key, a in actions.items())
+
+    def set_button(self, action, key):
+        """
+        Changes the key for one thing the player does
+        :param action: one of ACTIONS, such as RUN
+        :param key: the integer representing the key, such as K_SPACE
+        """
+        self.__keys[action] = key
+        self.__compile()
 
     def set_move_buttons(self, up=K_w, down=K_s, right=K_d, left=K_a, run=K_SPACE, pickup_r=K_e, pickup_l=K_q,
                          auto_eat=False):
@@ -63,13 +353,8 @@ class Buttons(object):
         This function provides a quick way to change between the two common button layouts.
         When it is used it sets the movement to the a,s,d,w keys and the other buttons around these
         """
-        self.__up = up
-        self.__down = down
-        self.__right = right
-        self.__left = left
-        self.__run = run
-        self.__pick_up_R = pickup_r
-        self.__pick_up_L = pickup_l
+        self.__keys.update({GO_UP: up, GO_DOWN: down, GO_RIGHT: right, GO_LEFT: left, RUN: run,
+                            PICKUP_RIGHT: pickup_r, PICKUP_LEFT: pickup_l})
         self.auto_eat(auto_eat)
 
     def auto_eat(self, on, eat_r=K_r, eat_l=K_TAB):
@@ -78,89 +363,117 @@ class Buttons(object):
         to pick up and eat for example.
         """
         if on:
-            self.__eat_R = self.__pick_up_R
-            self.__eat_L = self.__pick_up_L
+            self.__keys[EAT_RIGHT] = self.__keys[PICKUP_RIGHT]
+            self.__keys[EAT_LEFT] = self.__keys[PICKUP_LEFT]
         if on is False:
-            self.__eat_R = eat_r
-            self.__eat_L = eat_l
+            self.__keys[EAT_RIGHT] = eat_r
+            self.__keys[EAT_LEFT] = eat_l
+        self.__compile()
+
+    def get_actions(self, key):
+        """
+        :param key: the integer representing a key
+        :return: tuple of what the key does, empty if it does nothing
+        """
+        return self.__actions.get(key, ())
+
+    def get_moves(self, pressed):
+        """
+        :param pressed: sequence of booleans for every key, such as from pygame.key.get_pressed
+        :return: list of booleans of whether to go up, left, down and right, the keys list for the main character
+        """
+        return [bool(pressed[self.__keys[move]]) for move in MOVES]
+
+    def get_button(self, action):
+        """
+        :param action: one of ACTIONS
+        :return: the integer representing the key chosen for this function
+        """
+        return self.__keys[action]
 
     def get_up(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__up
+        return self.__keys[GO_UP]
 
     def get_down(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__down
+        return self.__keys[GO_DOWN]
 
     def get_right(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__right
+        return self.__keys[GO_RIGHT]
 
     def get_left(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__left
+        return self.__keys[GO_LEFT]
 
     def get_run(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__run
+        return self.__keys[RUN]
 
     def get_pickup_right(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__pick_up_R
+        return self.__keys[PICKUP_RIGHT]
 
     def get_pickup_left(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__pick_up_L
+        return self.__keys[PICKUP_LEFT]
 
     def get_eat_right(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__eat_R
+        return self.__keys[EAT_RIGHT]
 
     def get_eat_left(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__eat_L
+        return self.__keys[EAT_LEFT]
 
     def get_save(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__save
+        return self.__keys[SAVE]
 
     def get_open(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__open
+        return self.__keys[OPEN]
 
     def get_volume_down(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__volume_down
+        return self.__keys[VOLUME_DOWN]
 
     def get_volume_up(self):
         """
         ":return: the integer representing the key chosen for this function
         """
-        return self.__volume_up
+        return self.__keys[VOLUME_UP]
+
+    def get_profile(self):
+        """
+        ":return: the integer representing the key chosen for this function
+        """
+        return self.__keys[PROFILE]
 
     def __str__(self):
         """
@@ -174,18 +487,98 @@ class Buttons(object):
         s += separator + str(self.get_eat_right()) + separator + str(self.get_eat_left())
         s += separator + str(self.get_save()) + separator
         s += str(self.get_open()) + separator + str(self.get_volume_down()) + separator + str(self.get_volume_up())
+        s += separator + str(self.get_profile())
         return s
 
 
+class ScriptedInput(object):
+    """
+    Key presses to play back instead of using the keyboard, such as when the game runs without a window.
+    Each event is posted to the pygame event queue at the start of the frame it was given for.
+    """
+    def __init__(self):
+        """
+        Initializes the script without any key presses
+        """
+        self.__events = {}  # frame: list of (event type, key)
+        self.__last_frame = 0
+        self.__pressed = collections.defaultdict(bool)  # key: whether it is held down by the events posted so far
+
+    def __add(self, frame, event_type, key=None):
+        """
+        Adds an event to the script
+        :param frame: the number of the frame starting at 1
+        """
+        self.__events.setdefault(frame, []).append((event_type, key))
+        self.__last_frame = max(self.__last_frame, frame)
+
+    def press(self, frame, key):
+        """
+        Presses the key down at the frame
+        """
+        self.__add(frame, KEYDOWN, key)
+
+    def release(self, frame, key):
+        """
+        Lets the key up at the frame
+        """
+        self.__add(frame, KEYUP, key)
+
+    def hold(self, frame, key, frames=1):
+        """
+        Presses the key down at the frame and lets it up the number of frames later
+        """
+        self.press(frame, key)
+        self.release(frame + max(1, frames), key)
+
+    def quit(self, frame):
+        """
+        Closes the window at the frame
+        """
+        self.__add(frame, QUIT)
+
+    def get_events(self, frame):
+        """
+        :return: The list of (event type, key) for the frame
+        """
+        return self.__events.get(frame, [])
+
+    def get_last_frame(self):
+        """
+        :return: The number of the last frame with an event
+        """
+        return self.__last_frame
+
+    def post(self, frame):
+        """
+        Puts the events for the frame into the pygame event queue
+        """
+        for event_type, key in self.__events.get(frame, []):
+            if key is None:
+                pygame.event.post(pygame.event.Event(event_type))
+            else:
+                pygame.event.post(pygame.event.Event(event_type, key=key))
+                self.__pressed[key] = event_type == KEYDOWN
+
+    def get_pressed(self):
+        """
+        Used like pygame.key.get_pressed, since the posted events do not change the keyboard's state
+        :return: the keys held down by the events posted so far, as booleans looked up by key
+        """
+        return self.__pressed
+
+
 class Viewer(object):
     """
     Limits the movement of the player to what is visible
     """
-    def __init__(self, screen_width, screen_height, border=0):
+    def __init__(self, screen_width, screen_height, border=0, margin=100):
         """
         Initializes the screen
+        :param margin: how far outside the window in pixels sprites are still updated and drawn
         """
         self.__border = border
+        self.__margin = margin
         self.__set_screen_size(screen_width, screen_height, border=border)
 
     def get_border(self):
@@ -208,6 +601,36 @@ class Viewer(object):
         """
         return [self.__screen_width, self.__screen_height]
 
+    def get_margin(self):
+        """
+        :return: The integer amount outside the window in pixels where sprites are still updated and drawn
+        """
+        return self.__margin
+
+    def set_margin(self, margin):
+        """
+        Sets how far outside the window in pixels sprites are still updated and drawn
+        :param margin: Must be a positive integer more than the distance anything moves in one frame.
+        """
+        if margin >= 0:
+            self.__margin = margin
+
+    def get_cull_rect(self, background_position):
+        """
+        :param background_position: The x, y coordinates of the top left corner of the background on the screen
+        :return: A rectangle in background coordinates of the window and the margin around it.
+            Sprites outside of it are not updated or drawn.
+        """
+        return self.get_view_rect(background_position).inflate(self.__margin * 2, self.__margin * 2)
+
+    def get_view_rect(self, background_position):
+        """
+        :param background_position: The x, y coordinates of the top left corner of the background on the screen
+        :return: A rectangle of the part of the background that is visible in the window
+        """
+        return pygame.Rect(-background_position[0], -background_position[1], self.__screen_width,
+                           self.__screen_height)
+
     def __set_screen_size(self, width, height, border=0):
         """
         :param width: sets the window width
@@ -220,21 +643,31 @@ class Viewer(object):
         self.__border = border
 
 
+# Body segments, in the order of the damage, healing and health lists
+HEAD = 0
+TORSO = 1
+RIGHT_ARM = 2
+LEFT_ARM = 3
+LEGS = 4
+SEGMENTS = range(5)
+POISON_SEGMENTS = [HEAD, TORSO, RIGHT_ARM, LEFT_ARM, LEGS, LEGS]  # modeling the two legs on a person
+
+
 class Health(object):
     """
     Contains functions for damage and healing.
     Damage effects the specified body segment by the amount until reaches 0, then it damages the torso until dead.
     Also, reports when a body segment is critical or broken.
+    The health of the body segments is kept in one array in the order of the segment numbers such as HEAD.
     """
+    __slots__ = ('__health', '__total_health', '__low_health', '__max_damage', '__max_healing', '__max_health',
+                 '__alive', '__critical', '__broken', '__version')
+
     def __init__(self):
         """
-        Initializes the health variables and the HUD pictures
+        Initializes the health variables. The pictures are kept separately by the HealthHUD class.
         """
-        self.__health_head = 21
-        self.__health_torso = 28
-        self.__health_right_arm = 14
-        self.__health_left_arm = 14
-        self.__health_legs = 21
+        self.__health = array.array('i', [21, 28, 14, 14, 21])  # head, torso, right arm, left arm, legs
         self.__total_health = self.get_health_total()  # total health: 98
         self.__low_health = 12
         self.__max_damage = -6
@@ -245,49 +678,13 @@ class Health(object):
         self.__alive = True
         self.__critical = [False, False, False, False, False]
         self.__broken = [False, False, False, False, False]
+        self.__version = 0  # counts the changes so the HUD is only drawn again when it changes
 
-        self.torso_green = HUD('health_bar/torso_green.png', [19 + 1, 18])  # [19, 18] is against the top right corner
-        self.head_green = HUD('health_bar/health_head_green.png', [self.torso_green.get_position()[0] + 5,
-                                                                   self.torso_green.get_position()[1] - 18])
-        self.right_arm_green = HUD('health_bar/arm_green.png', [self.torso_green.get_position()[0] + 26,
-                                                                self.torso_green.get_position()[1] + 2])
-        self.left_arm_green = HUD('health_bar/arm_green.png', [self.torso_green.get_position()[0] - 19,
-                                                               self.torso_green.get_position()[1] + 2])
-        self.legs_green = HUD('health_bar/legs_green.png', [self.torso_green.get_position()[0],
-                                                            (self.torso_green.get_position()[1] + 2) * 2])
-
-        self.torso_orange = HUD('health_bar/torso_orange.png', [self.torso_green.get_position()[0],
-                                                                self.torso_green.get_position()[1]])
-        self.head_orange = HUD('health_bar/health_head_orange.png', [self.head_green.get_position()[0],
-                                                                     self.head_green.get_position()[1]])
-        self.left_arm_orange = HUD('health_bar/arm_orange.png', [self.left_arm_green.get_position()[0],
-                                                                 self.left_arm_green.get_position()[1]])
-        self.right_arm_orange = HUD('health_bar/arm_orange.png', [self.right_arm_green.get_position()[0],
-                                                                  self.right_arm_green.get_position()[1]])
-        self.legs_orange = HUD('health_bar/legs_orange.png', [self.legs_green.get_position()[0],
-                                                              self.legs_green.get_position()[1]])
-
-        self.torso_yellow = HUD('health_bar/torso_yellow.png', [self.torso_green.get_position()[0],
-                                                                self.torso_green.get_position()[1]])
-        self.head_yellow = HUD('health_bar/health_head_yellow.png', [self.head_green.get_position()[0],
-                                                                     self.head_green.get_position()[1]])
-        self.left_arm_yellow = HUD('health_bar/arm_yellow.png', [self.left_arm_green.get_position()[0],
-                                                                 self.left_arm_green.get_position()[1]])
-        self.right_arm_yellow = HUD('health_bar/arm_yellow.png', [self.right_arm_green.get_position()[0],
-                                                                  self.right_arm_green.get_position()[1]])
-        self.legs_yellow = HUD('health_bar/legs_yellow.png', [self.legs_green.get_position()[0],
-                                                              self.legs_green.get_position()[1]])
-
-        self.torso_red = HUD('health_bar/torso_red.png', [self.torso_green.get_position()[0],
-                                                          self.torso_green.get_position()[1]])
-        self.head_red = HUD('health_bar/health_head_red.png', [self.head_green.get_position()[0],
-                                                               self.head_green.get_position()[1]])
-        self.left_arm_red = HUD('health_bar/arm_red.png', [self.left_arm_green.get_position()[0],
-                                                           self.left_arm_green.get_position()[1]])
-        self.right_arm_red = HUD('health_bar/arm_red.png', [self.right_arm_green.get_position()[0],
-                                                            self.right_arm_green.get_position()[1]])
-        self.legs_red = HUD('health_bar/legs_red.png', [self.legs_green.get_position()[0],
-                                                        self.legs_green.get_position()[1]])
+    def get_version(self):
+        """
+        :return: An integer that goes up every time the health, critical or broken body segments might have changed
+        """
+        return self.__version
 
     def update(self, damage, healing, poison_strength=1):
         """
@@ -296,68 +693,70 @@ class Health(object):
         :param healing: List of healing done
         :param poison_strength: Integer from 1 to 64 that sets the probability of being poisoned
         """
-        if damage[0] < 0:
-            self.damage_head_health(damage[0])
-        if damage[1] < 0:
-            self.damage_torso_health(damage[1])
-        if damage[2] < 0:
-            self.damage_right_arm_health(damage[2])
-        if damage[3] < 0:
-            self.damage_left_arm_health(damage[3])
-        if damage[4] < 0:
-            self.damage_legs_health(damage[4])
+        self.apply(damage=damage)
         if damage[5] is True:
             self.poison(poison_strength)
+        self.apply(healing=healing)
 
-        if healing[0] > 0:
-            self.heal_head(healing[0])
-        if healing[1] > 0:
-            self.heal_torso(healing[1])
-        if healing[2] > 0:
-            self.heal_right_arm(healing[2])
-        if healing[3] > 0:
-            self.heal_left_arm(healing[3])
-        if healing[4] > 0:
-            self.heal_legs(healing[4])
+    def apply(self, damage=None, healing=None):
+        """
+        Damages then heals every body segment in order, the same as calling the damage and heal function of each
+        :param damage: List of the negative damage to each body segment. Other numbers are ignored
+        :param healing: List of the positive healing of each body segment. Other numbers are ignored
+        """
+        if damage is not None:
+            for segment in SEGMENTS:
+                if damage[segment] < 0:
+                    self.damage_segment(segment, damage[segment])
+        if healing is not None:
+            for segment in SEGMENTS:
+                if healing[segment] > 0:
+                    self.heal_segment(segment, healing[segment])
 
     def get_health_total(self):
         """
         Sums up the health of the different body segments to get the total
         :return: integer of the total health
         """
-        self.__total_health = self.__health_head + self.__health_torso + self.__health_right_arm
-        self.__total_health += self.__health_left_arm + self.__health_legs
+        self.__total_health = sum(self.__health)
         return self.__total_health
 
+    def get_segment_health(self, segment):
+        """
+        :param segment: the number of the body segment such as HEAD
+        :return: The integer representing this body segment
+        """
+        return self.__health[segment]
+
     def get_head_health(self):
         """
         :return: The integer representing this body segment
         """
-        return self.__health_head
+        return self.__health[HEAD]
 
     def get_torso_health(self):
         """
         :return: The integer representing this body segment
         """
-        return self.__health_torso
+        return self.__health[TORSO]
 
     def get_right_arm_health(self):
         """
         :return: The integer representing this body segment
         """
-        return self.__health_right_arm
+        return self.__health[RIGHT_ARM]
 
     def get_left_arm_health(self):
         """
         :return: The integer representing this body segment
         """
-        return self.__health_left_arm
+        return self.__health[LEFT_ARM]
 
     def get_legs_health(self):
         """
         :return: The integer representing this body segment
         """
-        return self.__health_legs
+        return self.__health[LEGS]
 
     def get_alive(self):
         """
@@ -365,6 +764,30 @@ class Health(object):
         """
         return self.__alive
 
+    def get_max_damage(self):
+        """
+        :return: The negative integer of the most damage allowed at once
+        """
+        return self.__max_damage
+
+    def get_max_healing(self):
+        """
+        :return: The integer of the most healing allowed at once
+        """
+        return self.__max_healing
+
+    def get_max_health(self):
+        """
+        :return: The integer above which a body segment is not healed
+        """
+        return self.__max_health
+
+    def get_low_health(self):
+        """
+        :return: The integer below which a body segment is shown in orange
+        """
+        return self.__low_health
+
     def get_critical(self):
         """
         :return: The list of critical body segments
@@ -382,136 +805,118 @@ class Health(object):
         Changes the health when the save is opened
         """
         if use == 227*25:  # this is a simple pass code so not anyone can use this function
-            if 0 <= health[0] <= self.__max_health:
-                self.__health_head = health[0]
-            if 0 <= health[1] <= self.__max_health:
-                self.__health_torso = health[1]
-            if 0 <= health[2] <= self.__max_health:
-                self.__health_right_arm = health[2]
-            if 0 <= health[3] <= self.__max_health:
-                self.__health_left_arm = health[3]
-            if 0 <= health[4] <= self.__max_health:
-                self.__health_legs = health[4]
-            else:
+            self.__version += 1
+            for segment in SEGMENTS:
+                if 0 <= health[segment] <= self.__max_health:
+                    self.__health[segment] = int(health[segment])
+            if not 0 <= health[LEGS] <= self.__max_health:
                 print 'open error'
 
+    def damage_segment(self, segment, amount):
+        """
+        This function causes the health to decrease for the body segment with the damage amount provided.
+        When the body segment is broken the rest of the damage goes to the torso.
+        :param segment: the number of the body segment such as HEAD
+        :param amount: Negative integer above the max possible damage
+        :return: False if the amount is not allowed, otherwise True
+        """
+        if not self.__max_damage <= amount <= 0:
+            if segment == HEAD:  # only the head reports it
+                print "damage needs to be a negative number"
+            return False
+        self.__version += 1
+        remaining = self.__health[segment] + amount  # adding a negative is subtracting
+        self.__health[segment] = remaining
+        self.__critical[segment] = True
+        if remaining <= 0:
+            self.__broken[segment] = True
+            self.__health[segment] = 0
+            if segment == TORSO:
+                self.__alive = False
+            else:
+                self.damage_segment(TORSO, 0 + remaining)  # adding a negative is subtracting
+        return True
+
     def damage_head_health(self, amount):
         """
         This function causes the health to decrease for this body segment with the damage amount provided
         :param amount: Negative integer above the max possible damage
         """
-        if self.__max_damage <= amount <= 0:  # if negative
-            remaining = self.get_head_health() + amount  # adding a negative is subtracting
-            self.__health_head = remaining
-            self.__critical[0] = True
-            if remaining <= 0:
-                self.__broken[0] = True
-                self.__health_head = 0
-                self.damage_torso_health(0 + remaining)  # adding a negative is subtracting
-        else:
-            print "damage needs to be a negative number"
+        self.damage_segment(HEAD, amount)
 
     def damage_torso_health(self, amount):
         """
         This function causes the health to decrease for this body segment with the damage amount provided
         :param amount: Negative integer above the max possible damage
         """
-        if self.__max_damage <= amount <= 0:  # if negative
-            remaining = self.get_torso_health() + amount
-            self.__health_torso = remaining
-            self.__critical[1] = True
-            if self.get_torso_health() <= 0:
-                self.__broken[1] = True
-                self.__health_torso = 0
-                self.__alive = False
+        self.damage_segment(TORSO, amount)
 
     def damage_right_arm_health(self, amount):
         """
         This function causes the health to decrease for this body segment with the damage amount provided
         :param amount: Negative integer above the max possible damage
         """
-        if self.__max_damage <= amount <= 0:  # if negative
-            remaining = self.get_right_arm_health() + amount
-            self.__health_right_arm = remaining
-            self.__critical[2] = True
-            if remaining <= 0:
-                self.__broken[2] = True
-                self.__health_right_arm = 0
-                self.damage_torso_health(0 + remaining)
+        self.damage_segment(RIGHT_ARM, amount)
 
     def damage_left_arm_health(self, amount):
         """
         This function causes the health to decrease for this body segment with the damage amount provided
         :param amount: Negative integer above the max possible damage
         """
-        if self.__max_damage <= amount <= 0:  # if negative
-            remaining = self.get_left_arm_health() + amount
-            self.__health_left_arm = remaining
-            self.__critical[3] = True
-            if remaining <= 0:
-                self.__broken[3] = True
-                self.__health_left_arm = 0
-                self.damage_torso_health(0 + remaining)
+        self.damage_segment(LEFT_ARM, amount)
 
     def damage_legs_health(self, amount):
         """
         This function causes the health to decrease for this body segment with the damage amount provided
         :param amount: Negative integer above the max possible damage
         """
-        if self.__max_damage <= amount <= 0:  # if negative
-            remaining = self.get_legs_health() + amount
-            self.__health_legs = remaining
-            self.__critical[4] = True
-            if remaining <= 0:
-                self.__broken[4] = True
-                self.__health_legs = 0
-                self.damage_torso_health(0 + remaining)
+        self.damage_segment(LEGS, amount)
+
+    def heal_segment(self, segment, amount):
+        """
+        This function causes the health to increase for the body segment with the healing amount provided
+        :param segment: the number of the body segment such as HEAD
+        :param amount: positive integer below the max possible healing at one time
+        :return: False if the amount is not allowed, otherwise True
+        """
+        if not 0 <= amount <= self.__max_healing:
+            if segment == HEAD:  # only the head reports it
+                print "healing needs to be a positive number below " + str(self.__max_healing)
+            return False
+        self.__version += 1
+        if self.__health[segment] <= self.__max_health:
+            self.__health[segment] += amount
+        if self.__health[segment] > 0:
+            self.__broken[segment] = False
+        return True
 
     def heal_head(self, amount):
         """
         This function causes the health to increase for this body segment with the healing amount provided
         :param amount: positive integer below the max possible healing at one time
         """
-        if 0 <= amount <= self.__max_healing:  # if positive
-            if self.__health_head <= self.__max_health:
-                self.__health_head += amount
-            if self.get_head_health() > 0:
-                self.__broken[0] = False
-        else:
-            print "healing needs to be a positive number below " + str(self.__max_healing)
+        self.heal_segment(HEAD, amount)
 
     def heal_torso(self, amount):
         """
         This function causes the health to increase for this body segment with the healing amount provided
         :param amount: positive integer below the max possible healing at one time
         """
-        if 0 <= amount <= self.__max_healing:  # if positive
-            if self.__health_torso <= self.__max_health:
-                self.__health_torso += amount
-            if self.get_torso_health() > 0:
-                self.__broken[1] = False
+        self.heal_segment(TORSO, amount)
 
     def heal_right_arm(self, amount):
         """
         This function causes the health to increase for this body segment with the healing amount provided
         :param amount: positive integer below the max possible healing at one time
         """
-        if 0 <= amount <= self.__max_healing:  # if positive
-            if self.__health_right_arm <= self.__max_health:
-                self.__health_right_arm += amount
-            if self.get_right_arm_health() > 0:
-                self.__broken[2] = False
+        self.heal_segment(RIGHT_ARM, amount)
 
     def heal_left_arm(self, amount):
         """
         This function causes the health to increase for this body segment with the healing amount provided
         :param amount: positive integer below the max possible healing at one time
         """
-        if 0 <= amount <= self.__max_healing:  # if positive
-            if self.__health_left_arm <= self.__max_health:
-                self.__health_left_arm += amount
-            if self.get_left_arm_health() > 0:
-                self.__broken[3] = False
+        self.heal_segment(LEFT_ARM, amount)
 
     def heal_both_arms(self, amount):
         """
@@ -526,11 +931,7 @@ class Health(object):
         This function causes the health to increase for this body segment with the healing amount provided
         :param amount: positive integer below the max possible healing at one time
         """
-        if 0 <= amount <= self.__max_healing:  # if positive
-            if self.__health_legs <= self.__max_health:
-                self.__health_legs += amount
-            if self.get_legs_health() > 0:
-                self.__broken[4] = False
+        self.heal_segment(LEGS, amount)
 
     # TODO change poison to be an attribute that can be applied to any damage?
     def poison(self, strength=1):
@@ -554,19 +955,9 @@ class Health(object):
             print 'poison strength out of bounds'
         strength = __s_max - strength  # the higher the strength the more powerful
 
-        rand = random.randint(0, (5 + strength))  # 6/7 to 6/70 chance of doing damage
-        if rand == 0:
-            self.damage_head_health(poison_damage)
-        elif rand == 1:
-            self.damage_torso_health(poison_damage)
-        elif rand == 2:
-            self.damage_right_arm_health(poison_damage)
-        elif rand == 3:
-            self.damage_left_arm_health(poison_damage)
-        elif rand == 4:
-            self.damage_legs_health(poison_damage)
-        elif rand == 5:
-            self.damage_legs_health(poison_damage)  # modeling the two legs on a person
+        rand = Dice.stream('poison').randint(0, (5 + strength))  # 6/7 to 6/70 chance of doing damage
+        if rand < len(POISON_SEGMENTS):
+            self.damage_segment(POISON_SEGMENTS[rand], poison_damage)
 
     @staticmethod
     def choose_damage(damage_amount, body_segment=-1):
@@ -579,21 +970,13 @@ class Health(object):
         damage = [0, 0, 0, 0, 0, False]
 
         if body_segment == -1:  # if random
-            r = random.randint(0, 6)
+            r = Dice.stream('combat').randint(0, 6)
             choose = r
         else:
             choose = body_segment
 
-        if choose == 0:
-            damage[0] = damage_amount
-        if choose == 1:
-            damage[1] = damage_amount
-        if choose == 2:
-            damage[2] = damage_amount
-        if choose == 3:
-            damage[3] = damage_amount
-        if choose == 4:
-            damage[4] = damage_amount
+        if choose in SEGMENTS:
+            damage[choose] = damage_amount
         if choose == 5:
             damage[5] = True
         return damage
@@ -603,22 +986,14 @@ class Health(object):
         Sets the internal critical list back to default
         """
         self.__critical = [False, False, False, False, False]
+        self.__version += 1
 
     def reset_broken(self):
         """
         Sets the internal broken list back to default
         """
         self.__broken = [False, False, False, False, False]
-
-    def all_hud(self):
-        """
-        :return: Returns four lists containing the colored images for the body segments of the heads up display
-        """
-        green = [self.head_green, self.torso_green, self.right_arm_green, self.left_arm_green, self.legs_green]
-        orange = [self.head_orange, self.torso_orange, self.right_arm_orange, self.left_arm_orange, self.legs_orange]
-        yellow = [self.head_yellow, self.torso_yellow, self.right_arm_yellow, self.left_arm_yellow, self.legs_yellow]
-        red = [self.head_red, self.torso_red, self.right_arm_red, self.left_arm_red, self.legs_red]
-        return green, orange, yellow, red
+        self.__version += 1
 
     def create_hud(self):
         """
@@ -626,44 +1001,9 @@ class Health(object):
         :return: Three lists of integers that vary in length depending on which color other than green should be shown
         """
 
-        orange = []
-        yellow = []
-        red = []
-
-        if self.get_head_health() < self.__low_health:
-            orange.append(0)
-        if self.get_torso_health() < self.__low_health:
-            orange.append(1)
-        if self.get_right_arm_health() < self.__low_health:
-            orange.append(2)
-        if self.get_left_arm_health() < self.__low_health:
-            orange.append(3)
-        if self.get_legs_health() < self.__low_health:
-            orange.append(4)
-
-        if self.get_critical() != [False, False, False, False, False]:
-            if self.get_critical()[0] is True and self.get_broken()[0] is False:
-                yellow.append(0)
-            if self.get_critical()[1] is True and self.get_broken()[1] is False:
-                yellow.append(1)
-            if self.get_critical()[2] is True and self.get_broken()[2] is False:
-                yellow.append(2)
-            if self.get_critical()[3] is True and self.get_broken()[3] is False:
-                yellow.append(3)
-            if self.get_critical()[4] is True and self.get_broken()[4] is False:
-                yellow.append(4)
-
-        if self.get_broken() != [False, False, False, False, False]:
-            if self.get_broken()[0] is True:
-                red.append(0)
-            if self.get_broken()[1] is True:
-                red.append(1)
-            if self.get_broken()[2] is True:
-                red.append(2)
-            if self.get_broken()[3] is True:
-                red.append(3)
-            if self.get_broken()[4] is True:
-                red.append(4)
+        orange = [segment for segment in SEGMENTS if self.__health[segment] < self.__low_health]
+        yellow = [segment for segment in SEGMENTS if self.__critical[segment] and not self.__broken[segment]]
+        red = [segment for segment in SEGMENTS if self.__broken[segment]]
         return orange, yellow, red
 
     def set_low_health(self, low):
@@ -673,6 +1013,7 @@ class Health(object):
         """
         if 0 < low < self.__max_health:
             self.__low_health = low
+            self.__version += 1
 
     def __str__(self):
         """
@@ -686,6 +1027,234 @@ class Health(object):
         return r
 
 
+class HealthBatch(object):
+    """
+    The health of many characters kept in arrays with one row for each character, so damage and healing are applied
+    to all of them at once, such as for balancing the game. Gives the same results as applying each row to its own
+    Health object, including the damage to a broken body segment going to the torso.
+    Without numpy it holds a Health object for each character instead.
+    """
+    def __init__(self, number):
+        """
+        Initializes every character with the starting health of a Health object
+        :param number: the number of characters
+        """
+        start = Health()
+        self.__number = number
+        self.__max_damage = start.get_max_damage()
+        self.__max_healing = start.get_max_healing()
+        self.__max_health = start.get_max_health()
+        if numpy is None:
+            self.__healths = [Health() for n in range(number)]
+            return
+        segments = [start.get_segment_health(segment) for segment in SEGMENTS]
+        self.__health = numpy.tile(numpy.array(segments, dtype=numpy.int64), (number, 1))
+        self.__critical = numpy.zeros((number, len(SEGMENTS)), dtype=bool)
+        self.__broken = numpy.zeros((number, len(SEGMENTS)), dtype=bool)
+        self.__alive = numpy.ones(number, dtype=bool)
+
+    def __len__(self):
+        """
+        :return: The number of characters
+        """
+        return self.__number
+
+    def __rows(self, amounts):
+        """
+        :param amounts: a list of 5 numbers for every character, a list with a list of 5 numbers for each character
+            or None
+        :return: a list with a list of 5 numbers or None for each character
+        """
+        if amounts is None or not hasattr(amounts[0], '__len__'):
+            return [amounts] * self.__number
+        return amounts
+
+    def apply(self, damage=None, healing=None):
+        """
+        Damages then heals every body segment of every character
+        :param damage: the negative damage to each body segment, either 5 numbers for every character or an array with
+            a row of 5 for each character. Other numbers are ignored
+        :param healing: the positive healing of each body segment in the same form as the damage
+        """
+        if numpy is None:
+            for health, d, h in zip(self.__healths, self.__rows(damage), self.__rows(healing)):
+                health.apply(damage=d, healing=h)
+            return
+
+        if damage is not None:
+            damage = numpy.broadcast_to(numpy.asarray(damage, dtype=numpy.int64), self.__health.shape)
+            hit = (damage < 0) & (damage >= self.__max_damage)
+            torso_hit = hit[:, TORSO].copy()
+            torso_damage = numpy.where(torso_hit, damage[:, TORSO], 0)
+
+            limbs = [segment for segment in SEGMENTS if segment != TORSO]
+            remaining = self.__health[:, limbs] + numpy.where(hit[:, limbs], damage[:, limbs], 0)
+            limb_hit = hit[:, limbs]
+            limb_broken = limb_hit & (remaining <= 0)
+            self.__health[:, limbs] = numpy.where(limb_hit, numpy.maximum(remaining, 0), self.__health[:, limbs])
+            self.__critical[:, limbs] |= limb_hit
+            self.__broken[:, limbs] |= limb_broken
+
+            # the rest of the damage to a broken segment goes to the torso
+            torso_hit |= limb_broken.any(axis=1)
+            torso_damage += numpy.where(limb_broken, remaining, 0).sum(axis=1)
+            torso = self.__health[:, TORSO] + torso_damage  # all the damage only goes down so only the end matters
+            torso_broken = torso_hit & (torso <= 0)
+            self.__health[:, TORSO] = numpy.where(torso_hit, numpy.maximum(torso, 0), self.__health[:, TORSO])
+            self.__critical[:, TORSO] |= torso_hit
+            self.__broken[:, TORSO] |= torso_broken
+            self.__alive &= ~torso_broken
+
+        if healing is not None:
+            healing = numpy.broadcast_to(numpy.asarray(healing, dtype=numpy.int64), self.__health.shape)
+            healed = (healing > 0) & (healing <= self.__max_healing)
+            self.__health += numpy.where(healed & (self.__health <= self.__max_health), healing, 0)
+            self.__broken &= ~(healed & (self.__health > 0))
+
+    def poison(self, strength=1, poisoned=None):
+        """
+        Poisons the characters the same way as Health.poison, each with its own random number
+        :param strength: Integer from 1 to 64 specifying the probability the poison will cause damage
+        :param poisoned: list of booleans for which characters are poisoned. Every character if None
+        """
+        if poisoned is None:
+            poisoned = [True] * len(self)
+        if numpy is None:
+            for health, p in zip(self.__healths, poisoned):
+                if p:
+                    health.poison(strength)
+            return
+
+        s_max = 70 - 6  # = 64
+        if strength < 1 or strength > s_max:  # outer bounds inclusive
+            strength = 1  # reset to lowest strength
+            print 'poison strength out of bounds'
+        rand = Dice.ints('poison', 0, 5 + s_max - strength, len(self))
+        hit = numpy.asarray(poisoned, dtype=bool) & (rand < len(POISON_SEGMENTS))
+        damage = numpy.zeros(self.__health.shape, dtype=numpy.int64)
+        rows = numpy.flatnonzero(hit)
+        damage[rows, numpy.array(POISON_SEGMENTS)[rand[rows]]] = self.__max_damage
+        self.apply(damage=damage)
+
+    def update(self, damage, healing, poison_strength=1, poisoned=None):
+        """
+        Damages, poisons and then heals every character in the same order as Health.update
+        :param damage: the negative damage to each body segment, as for apply
+        :param healing: the positive healing of each body segment, as for apply
+        :param poison_strength: Integer from 1 to 64 that sets the probability of being poisoned
+        :param poisoned: list of booleans for which characters are poisoned. None are poisoned if None
+        """
+        self.apply(damage=damage)
+        if poisoned is not None:
+            self.poison(poison_strength, poisoned)
+        self.apply(healing=healing)
+
+    def get_health(self):
+        """
+        :return: An array with a row of the health of the 5 body segments of each character
+        """
+        if numpy is None:
+            return [[h.get_segment_health(segment) for segment in SEGMENTS] for h in self.__healths]
+        return self.__health.copy()
+
+    def get_alive(self):
+        """
+        :return: An array of booleans representing whether each character is alive
+        """
+        if numpy is None:
+            return [h.get_alive() for h in self.__healths]
+        return self.__alive.copy()
+
+    def get_critical(self):
+        """
+        :return: An array with a row of the critical body segments of each character
+        """
+        if numpy is None:
+            return [list(h.get_critical()) for h in self.__healths]
+        return self.__critical.copy()
+
+    def get_broken(self):
+        """
+        :return: An array with a row of the broken body segments of each character
+        """
+        if numpy is None:
+            return [list(h.get_broken()) for h in self.__healths]
+        return self.__broken.copy()
+
+    def reset_critical(self):
+        """
+        Sets every critical body segment back to default
+        """
+        if numpy is None:
+            for h in self.__healths:
+                h.reset_critical()
+            return
+        self.__critical[:] = False
+
+
+class Effects(object):
+    """
+    The effects on the main character that wear off after a while. Their timers call stop_running and cure when
+    they are due, so the main loop does not have to look for them.
+    """
+    def __init__(self):
+        """
+        Initializes the main character without any effects
+        """
+        self.__running = False
+        self.__bitten = False  # a spider bit and its poison does damage each second until cured
+        self.__poisoned = False  # the poison has done damage
+
+    def start_running(self):
+        """
+        The main character runs until stop_running
+        """
+        self.__running = True
+
+    def stop_running(self):
+        """
+        The main character walks again
+        """
+        self.__running = False
+
+    def get_running(self):
+        """
+        :return: A boolean representing whether the main character runs
+        """
+        return self.__running
+
+    def bite(self):
+        """
+        A spider bit the main character
+        """
+        self.__bitten = True
+
+    def get_bitten(self):
+        """
+        :return: A boolean representing whether the spider's poison does damage
+        """
+        return self.__bitten
+
+    def poison(self):
+        """
+        The spider's poison did damage
+        """
+        self.__poisoned = True
+
+    def get_poisoned(self):
+        """
+        :return: A boolean representing whether the poison did damage since the main character was last cured
+        """
+        return self.__poisoned
+
+    def cure(self):
+        """
+        The poison stops acting
+        """
+        self.__bitten = False
+        self.__poisoned = False
+
+
 class Background(pygame.sprite.Sprite):
     """moves the background on the screen """
     def __init__(self, image_file):
@@ -716,6 +1285,259 @@ class Background(pygame.sprite.Sprite):
         self.set_position(pos)
         self.rect.topleft = self.get_position()
 
+    def draw(self, surface, view, area=None):
+        """
+        Draws only the part of the background that is visible in the window, so the cost depends on the window size
+        and not the size of the background
+        :param surface: the screen
+        :param view: Viewer object for the size of the window
+        :param area: rectangle of the part of the window to draw. The whole window if set to None
+        :return: the number of blits
+        """
+        visible = view.get_view_rect(self.get_position())
+        if area is not None:
+            visible = visible.clip(area.move(visible.topleft))
+        visible = visible.clip(self.image.get_rect())
+        surface.blit(self.image, (visible.x + self.rect.x, visible.y + self.rect.y), visible)
+        return 1
+
+
+class TiledBackground(Background):
+    """
+    A background made out of tiles so the whole map never has to be held as one picture.
+    The map is kept as one small number per tile. Squares of tiles called chunks are drawn into pictures when they
+    come near the window, and the chunks that were used the longest time ago are dropped.
+    """
+    def __init__(self, tile_files, columns, rows, tile_map=None, chunk_tiles=2, max_chunks=32):
+        """
+        Initializes the background sprite
+        :param tile_files: list of paths to the tile images, which must all be the same size
+        :param columns: width of the map in tiles
+        :param rows: height of the map in tiles
+        :param tile_map: sequence of columns * rows indexes into tile_files, row by row. Random if set to None
+        :param chunk_tiles: width and height of a chunk in tiles
+        :param max_chunks: the most chunk pictures kept at once
+        """
+        pygame.sprite.Sprite.__init__(self)  # call Sprite initializer
+        self.__tiles = [load_image(f)[0] for f in tile_files]
+        self.__tile_size = self.__tiles[0].get_width()
+        self.__columns = columns
+        self.__rows = rows
+        if tile_map is None:
+            tile_map = Dice.ints('map', 0, len(self.__tiles) - 1, columns * rows)
+        self.__map = array.array('B', tile_map)  # one byte per tile
+        self.__chunk_tiles = max(1, chunk_tiles)
+        self.__chunk_size = self.__chunk_tiles * self.__tile_size
+        self.__chunks = collections.OrderedDict()  # (x, y): picture, ordered from least to most recently used
+        self.__max_chunks = max(1, max_chunks)
+        self.image = None  # there is no single picture, see draw()
+        self.rect = pygame.Rect(0, 0, columns * self.__tile_size, rows * self.__tile_size)
+        self.set_position([0, 0])  # initial position is actually set by the main function
+
+    def get_tile(self, column, row):
+        """
+        :return: the index of the tile image at the column and row
+        """
+        return self.__map[row * self.__columns + column]
+
+    def set_tile(self, column, row, tile):
+        """
+        Changes the tile image at the column and row and redraws its chunk the next time it is shown
+        :param tile: index into the list of tile images
+        """
+        if 0 <= tile < len(self.__tiles):
+            self.__map[row * self.__columns + column] = tile
+            self.__chunks.pop((column // self.__chunk_tiles, row // self.__chunk_tiles), None)
+
+    def get_chunk_count(self):
+        """
+        :return: The number of chunk pictures currently held
+        """
+        return len(self.__chunks)
+
+    def __chunk(self, x, y):
+        """
+        Returns the picture of the chunk, drawing it from the tiles if it is not held
+        :param x: column of the chunk
+        :param y: row of the chunk
+        :return: the picture of the chunk
+        """
+        chunk = self.__chunks.pop((x, y), None)
+        if chunk is None:
+            first_column = x * self.__chunk_tiles
+            first_row = y * self.__chunk_tiles
+            columns = min(self.__chunk_tiles, self.__columns - first_column)
+            rows = min(self.__chunk_tiles, self.__rows - first_row)
+            chunk = pygame.Surface((columns * self.__tile_size, rows * self.__tile_size)).convert()
+            for r in range(rows):
+                line = (first_row + r) * self.__columns + first_column
+                for c in range(columns):
+                    chunk.blit(self.__tiles[self.__map[line + c]], (c * self.__tile_size, r * self.__tile_size))
+            if len(self.__chunks) >= self.__max_chunks:
+                self.__chunks.popitem(last=False)  # drop the chunk that was used the longest time ago
+        self.__chunks[(x, y)] = chunk  # now the most recently used
+        return chunk
+
+    def __chunk_range(self, area):
+        """
+        :param area: rectangle in background coordinates
+        :return: the first and last columns and rows of the chunks touching the area
+        """
+        area = area.clip(pygame.Rect(0, 0, self.rect.w, self.rect.h))
+        return (area.left // self.__chunk_size, (area.right - 1) // self.__chunk_size,
+                area.top // self.__chunk_size, (area.bottom - 1) // self.__chunk_size)
+
+    def draw(self, surface, view, area=None):
+        """
+        Draws the chunks that are visible in the window.
+        Also draws at most one chunk next to the window ahead of time so moving does not draw many at once.
+        :param surface: the screen
+        :param view: Viewer object for the size of the window
+        :param area: rectangle of the part of the window to draw. The whole window if set to None
+        :return: the number of chunks drawn on the surface
+        """
+        visible = view.get_view_rect(self.get_position())
+        if area is not None:
+            part = area.move(visible.topleft).clip(visible)
+            left, right, top, bottom = self.__chunk_range(part)
+            for y in range(top, bottom + 1):
+                for x in range(left, right + 1):
+                    chunk = self.__chunk(x, y)
+                    chunk_area = part.move(-x * self.__chunk_size, -y * self.__chunk_size).clip(chunk.get_rect())
+                    surface.blit(chunk, (x * self.__chunk_size + self.rect.x + chunk_area.x,
+                                         y * self.__chunk_size + self.rect.y + chunk_area.y), chunk_area)
+            return (right - left + 1) * (bottom - top + 1)
+
+        left, right, top, bottom = self.__chunk_range(visible)
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                surface.blit(self.__chunk(x, y), (x * self.__chunk_size + self.rect.x,
+                                                  y * self.__chunk_size + self.rect.y))
+        blits = (right - left + 1) * (bottom - top + 1)
+
+        left, right, top, bottom = self.__chunk_range(visible.inflate(self.__chunk_size, self.__chunk_size))
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                if (x, y) not in self.__chunks:
+                    self.__chunk(x, y)
+                    return blits
+        return blits
+
+
+class DirtyRenderer(object):
+    """
+    Keeps track of the parts of the screen that changed since the last frame, so only they have their background
+    redrawn and only they are sent to the display.
+    The whole screen is redrawn when the background moves or when it is turned off.
+    """
+    def __init__(self, view, enabled=True):
+        """
+        Initializes the renderer so the first frame redraws the whole screen
+        :param view: Viewer object for the size of the window
+        :param enabled: when False every frame redraws the whole screen and flips the display
+        """
+        self.__view = view
+        self.__enabled = enabled
+        self.__background_position = None
+        self.__full = True
+        self.__drawn = {}  # sprite: (image, rectangle) as it was drawn in the last frame
+        self.__drawing = {}  # sprite: (image, rectangle) as it will be drawn in this frame
+        self.__states = {}  # name: (state, rectangle) of the other things on the screen such as the HUD
+        self.__dirty = []
+
+    def get_enabled(self):
+        """
+        :return: A boolean representing whether only the changed parts of the screen are redrawn
+        """
+        return self.__enabled
+
+    def set_enabled(self, on):
+        """
+        Turns redrawing only the changed parts of the screen on or off. The next frame redraws the whole screen.
+        """
+        self.__enabled = on
+        self.__background_position = None
+
+    def get_dirty(self):
+        """
+        :return: The list of rectangles that changed in this frame. Empty when the whole screen is redrawn
+        """
+        return self.__dirty
+
+    def begin(self, background_position):
+        """
+        Starts a new frame. Called once every second/60 before track and track_state.
+        :param background_position: the x, y coordinates of the background so moving it redraws the whole screen
+        """
+        position = (background_position[0], background_position[1])
+        self.__full = not self.__enabled or position != self.__background_position
+        self.__background_position = position
+        self.__drawing = {}
+        self.__dirty = []
+
+    def track(self, sprites):
+        """
+        Records the sprites that will be drawn in this frame so any that moved or changed are redrawn
+        :param sprites: a group or list of sprites
+        """
+        if self.__enabled:
+            for spr in sprites:
+                self.__drawing[spr] = (spr.image, pygame.Rect(spr.rect))
+
+    def track_state(self, name, rect, state):
+        """
+        Records something else drawn on the screen, so it is redrawn only when its state changes
+        :param name: string naming what is drawn
+        :param rect: the rectangle on the screen that it covers
+        :param state: anything that can be compared and changes when what is drawn changes
+        """
+        if self.__enabled:
+            last = self.__states.get(name)
+            if last is None or last[0] != state or last[1] != rect:
+                if last is not None:
+                    self.__dirty.append(last[1])
+                self.__dirty.append(pygame.Rect(rect))
+                self.__states[name] = (state, pygame.Rect(rect))
+
+    def draw_background(self, surface, background):
+        """
+        Draws the background behind everything that changed, or the whole background if it moved.
+        Afterwards everything tracked must be drawn again on top of it.
+        :param surface: the screen
+        :param background: Background object
+        :return: the number of blits used to draw the background
+        """
+        if self.__enabled:
+            for spr, (image, rect) in self.__drawing.iteritems():
+                last = self.__drawn.pop(spr, None)
+                if last is None:
+                    self.__dirty.append(rect)
+                elif last[0] is not image or last[1] != rect:
+                    self.__dirty.append(last[1])
+                    self.__dirty.append(rect)
+            for image, rect in self.__drawn.itervalues():  # the sprites that are no longer drawn
+                self.__dirty.append(rect)
+            self.__drawn = self.__drawing
+
+        if self.__full:
+            self.__dirty = []
+            return background.draw(surface, self.__view)
+        screen = surface.get_rect()
+        self.__dirty = [rect.clip(screen) for rect in self.__dirty if rect.colliderect(screen)]
+        blits = 0
+        for rect in self.__dirty:
+            blits += background.draw(surface, self.__view, area=rect)
+        return blits
+
+    def present(self):
+        """
+        Sends the frame to the display, either the whole screen or only the parts that changed
+        """
+        if self.__full:
+            pygame.display.flip()
+        elif self.__dirty:
+            pygame.display.update(self.__dirty)
+
 
 class HUD(pygame.sprite.Sprite):
     """
@@ -744,3 +1566,156 @@ class HUD(pygame.sprite.Sprite):
         """
         self.__position = pos
         self.rect.topleft = self.get_position()
+
+
+class HealthHUD(object):
+    """
+    The heads up display for the health of the character the player is watching.
+    The pictures are only loaded the first time they are needed, so characters that are never watched don't load any.
+    The colored body segments are drawn together into one picture, which is only drawn again when the health changes.
+    """
+    def __init__(self, health=None):
+        """
+        Initializes the heads up display without loading the pictures
+        :param health: the Health object being displayed
+        """
+        self.__health = health
+        self.__built = False
+        self.__key = (255, 255, 255)  # the transparent color of the health bar pictures
+        self.__picture = None
+        self.__rect = None
+        self.__version = None  # the Health version the picture was drawn for
+        self.__layers = None  # the orange, yellow and red body segments in the picture
+
+    def watch(self, health):
+        """
+        Changes which Health object is displayed without reloading the pictures
+        :param health: the Health object being displayed
+        """
+        self.__health = health
+        self.__version = None
+
+    def get_health(self):
+        """
+        :return: the Health object being displayed
+        """
+        return self.__health
+
+    def __build(self):
+        """
+        Loads the colored pictures for each body segment
+        """
+        self.torso_green = HUD('health_bar/torso_green.png', [19 + 1, 18])  # [19, 18] is against the top right corner
+        self.head_green = HUD('health_bar/health_head_green.png', [self.torso_green.get_position()[0] + 5,
+                                                                   self.torso_green.get_position()[1] - 18])
+        self.right_arm_green = HUD('health_bar/arm_green.png', [self.torso_green.get_position()[0] + 26,
+                                                                self.torso_green.get_position()[1] + 2])
+        self.left_arm_green = HUD('health_bar/arm_green.png', [self.torso_green.get_position()[0] - 19,
+                                                               self.torso_green.get_position()[1] + 2])
+        self.legs_green = HUD('health_bar/legs_green.png', [self.torso_green.get_position()[0],
+                                                            (self.torso_green.get_position()[1] + 2) * 2])
+
+        self.torso_orange = HUD('health_bar/torso_orange.png', [self.torso_green.get_position()[0],
+                                                                self.torso_green.get_position()[1]])
+        self.head_orange = HUD('health_bar/health_head_orange.png', [self.head_green.get_position()[0],
+                                                                     self.head_green.get_position()[1]])
+        self.left_arm_orange = HUD('health_bar/arm_orange.png', [self.left_arm_green.get_position()[0],
+                                                                 self.left_arm_green.get_position()[1]])
+        self.right_arm_orange = HUD('health_bar/arm_orange.png', [self.right_arm_green.get_position()[0],
+                                                                  self.right_arm_green.get_position()[1]])
+        self.legs_orange = HUD('health_bar/legs_orange.png', [self.legs_green.get_position()[0],
+                                                              self.legs_green.get_position()[1]])
+
+        self.torso_yellow = HUD('health_bar/torso_yellow.png', [self.torso_green.get_position()[0],
+                                                                self.torso_green.get_position()[1]])
+        self.head_yellow = HUD('health_bar/health_head_yellow.png', [self.head_green.get_position()[0],
+                                                                     self.head_green.get_position()[1]])
+        self.left_arm_yellow = HUD('health_bar/arm_yellow.png', [self.left_arm_green.get_position()[0],
+                                                                 self.left_arm_green.get_position()[1]])
+        self.right_arm_yellow = HUD('health_bar/arm_yellow.png', [self.right_arm_green.get_position()[0],
+                                                                  self.right_arm_green.get_position()[1]])
+        self.legs_yellow = HUD('health_bar/legs_yellow.png', [self.legs_green.get_position()[0],
+                                                              self.legs_green.get_position()[1]])
+
+        self.torso_red = HUD('health_bar/torso_red.png', [self.torso_green.get_position()[0],
+                                                          self.torso_green.get_position()[1]])
+        self.head_red = HUD('health_bar/health_head_red.png', [self.head_green.get_position()[0],
+                                                               self.head_green.get_position()[1]])
+        self.left_arm_red = HUD('health_bar/arm_red.png', [self.left_arm_green.get_position()[0],
+                                                           self.left_arm_green.get_position()[1]])
+        self.right_arm_red = HUD('health_bar/arm_red.png', [self.right_arm_green.get_position()[0],
+                                                            self.right_arm_green.get_position()[1]])
+        self.legs_red = HUD('health_bar/legs_red.png', [self.legs_green.get_position()[0],
+                                                        self.legs_green.get_position()[1]])
+        self.__built = True
+
+        green, orange, yellow, red = self.all_hud()
+        self.__rect = green[0].rect.unionall([spr.rect for spr in green[1:] + orange + yellow + red])
+        self.__picture = pygame.Surface(self.__rect.size).convert()
+        self.__picture.set_colorkey(self.__key, RLEACCEL)
+
+    def all_hud(self):
+        """
+        :return: Returns four lists containing the colored images for the body segments of the heads up display
+        """
+        if not self.__built:
+            self.__build()
+        green = [self.head_green, self.torso_green, self.right_arm_green, self.left_arm_green, self.legs_green]
+        orange = [self.head_orange, self.torso_orange, self.right_arm_orange, self.left_arm_orange, self.legs_orange]
+        yellow = [self.head_yellow, self.torso_yellow, self.right_arm_yellow, self.left_arm_yellow, self.legs_yellow]
+        red = [self.head_red, self.torso_red, self.right_arm_red, self.left_arm_red, self.legs_red]
+        return green, orange, yellow, red
+
+    def create_hud(self):
+        """
+        :return: Three lists of the body segments to show in orange, yellow and red for the watched health
+        """
+        return self.__health.create_hud()
+
+    def __refresh(self):
+        """
+        Finds the colors to show when the health changed, and draws the picture again when they changed
+        """
+        if not self.__built:
+            self.__build()
+        version = self.__health.get_version()
+        if version == self.__version:
+            return
+        self.__version = version
+        layers = self.create_hud()
+        if layers == self.__layers:
+            return
+        self.__layers = layers
+        green, orange, yellow, red = self.all_hud()
+        shown = []
+        for colored, segments in zip((orange, yellow, red), layers):
+            shown += [colored[segment] for segment in segments]
+        self.__picture.fill(self.__key)
+        for spr in green + shown:  # green is always on, the others cover it
+            self.__picture.blit(spr.image, spr.rect.move(-self.__rect.x, -self.__rect.y))
+
+    def get_rect(self):
+        """
+        :return: the rectangle on the screen covered by the health bar
+        """
+        if not self.__built:
+            self.__build()
+        return self.__rect
+
+    def get_layers(self):
+        """
+        :return: Three lists of the body segments shown in orange, yellow and red, the same as create_hud but only
+            worked out again when the health changes
+        """
+        self.__refresh()
+        return self.__layers
+
+    def draw(self, surface):
+        """
+        Draws the health bar
+        :param surface: the screen
+        :return: the number of blits
+        """
+        self.__refresh()
+        surface.blit(self.__picture, self.__rect)
+        return 1
@@ -1,5 +1,6 @@
 __author__ = 'ElectroNick'
 import pygame
+import MyGame_game_play as GPlay
 
 
 def intro():
@@ -22,7 +23,7 @@ def intro():
     background.blit(text, text.get_rect(centerx=background.get_width()/2))
     paragraph = pygame.font.Font(None, 24)
 
-    with open('data\\introduction.txt', mode='r') as intr:
+    with open(GPlay.data_path('introduction.txt'), mode='r') as intr:
         data = intr.readlines()
 
         # remove the new line characters
@@ -1,12 +1,26 @@
 __author__ = 'ElectroNick'
 
+import collections
 import pygame
-import random
+import MyGame_random as Dice
 import MyGame_game_play as GPlay
+import MyGame_spatial as Spatial
 
 
 # Game object classes
 
+# Tags for what kind of thing a sprite is, so it can be told apart without making a string of it
+MAIN_CHARACTER = 0
+FOE = 1
+ITEM = 2
+FOOD = 3
+MUD = 4
+PUDDLE = 5
+FIRE = 6
+HOUSE = 7
+
+KINDS_OF_FOOD = ('fruit', 'root', 'grain', 'vegetable', 'meat')
+
 
 class Animal(pygame.sprite.Sprite):
     """
@@ -29,7 +43,8 @@ class Animal(pygame.sprite.Sprite):
         self.__speed = self.__walk_speed
         self.__run_speed = speed * 2
         self.__keys = [False, False, False, False]
-        self.health = GPlay.Health()  # the separate Health class keeps vital variables private
+        self.spatial_hashes = []  # the SpatialHash objects to tell when it moves
+        self.health = GPlay.Health()  # only the numbers, the pictures are in the separate HealthHUD class
 
         self.__guy_up, self.__guy_up_rect = GPlay.load_image(image_files['up'], -1)
         self.__guy_right, self.__guy_right_rect = GPlay.load_image(image_files['right'], -1)
@@ -42,6 +57,14 @@ class Animal(pygame.sprite.Sprite):
         """This function is returned every second/60 in the update function"""
         return self.__position
 
+    def get_largest_size(self):
+        """
+        :return: list of the largest width and the largest height of its images, so a box that size fits it facing
+            any direction
+        """
+        rects = [self.__guy_up_rect, self.__guy_right_rect, self.__guy_left_rect, self.__guy_down_rect]
+        return [max(r.w for r in rects), max(r.h for r in rects)]
+
     def set_position(self, x, y):
         """
         Sets the internal position variables for the object
@@ -127,7 +150,6 @@ class Animal(pygame.sprite.Sprite):
             background_position = [0, 0]
 
         self.change_direction(keys)
-        self.set_background_position(background_position)
         x, y = self.get_position()
         cx, cy = x, y
         keys = self.get_keys()
@@ -146,14 +168,33 @@ class Animal(pygame.sprite.Sprite):
             x -= self.__speed
         elif keys[3]:  # right
             x += self.__speed
-        self.set_position(x, y)
 
         if stopped is True:
-            self.set_position(cx, cy)  # if stopped then does not change the position
+            x, y = cx, cy  # if stopped then does not change the position
+
+        self.place(x, y, background_position)
 
-        self.__actual_position = [self.get_position()[0] + self.get_background_position()[0],
-                                  self.get_position()[1] + self.get_background_position()[1]]
+    def place(self, x, y, background_position):
+        """
+        Puts the sprite at the position and moves its rectangle with the background
+        :param x: x axis
+        :param y: y axis
+        :param background_position: a list of x and y coordinates of the background
+        """
+        self.set_position(x, y)
+        self.set_background_position(background_position)
+        self.__actual_position = [x + background_position[0], y + background_position[1]]
         self.rect.center = self.__actual_position
+        for h in self.spatial_hashes:
+            h.update(self)
+
+    def get_world_rect(self):
+        """
+        :return: The rectangle of the sprite in background coordinates
+        """
+        rect = pygame.Rect(self.rect)
+        rect.center = self.get_position()
+        return rect
 
     def __str__(self):
         """
@@ -165,6 +206,8 @@ class Animal(pygame.sprite.Sprite):
 
 class MainCharacter(Animal):
     """The main character"""
+    tag = MAIN_CHARACTER
+
     def __init__(self, image_files, start_pos=(0, 0), speed=3):
         """
         Initializes the sprite
@@ -183,10 +226,108 @@ class MainCharacter(Animal):
         return 'Main Character: ' + Animal.__str__(self)
 
 
-class Foe(Animal):
+class Attacker(object):
+    """
+    The rules for the damage a foe does, kept apart from the sprite so they can be used without a display,
+    such as for balancing the game
+    """
+    def __init__(self, min_damage=2, max_damage=6):
+        """
+        Initializes the amounts of damage
+        :param min_damage: absolute value of the low damage
+        :param max_damage: absolute value of the high damage
+        """
+        self.min_damage = min_damage  # absolute value
+        self.max_damage = max_damage
+
+    @staticmethod
+    def __choose_damage(damage, damage_amount, body_segment=-1):
+        """
+        Sets the damage list
+        :param damage: Takes the current damage list
+        :param damage_amount: amount of damage to be done
+        :param body_segment: specifies which body segment to damage
+        :return: the damage list
+        """
+        # remember, damage is negative!
+        if body_segment == -1:  # if random
+            r = Dice.stream('combat').randint(0, 4)  # inclusive
+            choose = r
+        else:
+            choose = body_segment
+
+        if choose == 0:
+            damage[0] = damage_amount
+        if choose == 1:
+            damage[1] = damage_amount
+        if choose == 2:
+            damage[2] = damage_amount
+        if choose == 3:
+            damage[3] = damage_amount
+        if choose == 4:
+            damage[4] = damage_amount
+        return damage
+
+    def damage_low_random(self, damage):
+        """
+        Preset damage type
+        :param damage: Takes the current damage list
+        :return: the new damage list reflecting the changes
+        """
+        d = Dice.stream('combat').randint(1, self.min_damage)
+        d = -d
+        return self.__choose_damage(damage, d)
+
+    def damage_high_random(self, damage):
+        """
+        Preset damage type
+        :param damage: Takes the current damage list
+        :return: the new damage list reflecting the changes
+        """
+        d = Dice.stream('combat').randint(self.min_damage, self.max_damage)
+        d = -d
+        return self.__choose_damage(damage, d)
+
+    def damage_low_accurate(self, damage, body_segment):
+        """
+        Preset damage type
+        :param damage: Takes the current damage list
+        :param body_segment: the number of the body segment to be damaged
+        :return: the new damage list reflecting the changes
+        """
+        d = Dice.stream('combat').randint(1, self.min_damage)
+        d = -d
+        return self.__choose_damage(damage, d, body_segment=body_segment)
+
+    def damage_high_accurate(self, damage, body_segment):
+        """
+        Preset damage type
+        :param damage: Takes the current damage list
+        :param body_segment: the number of the body segment to be damaged
+        :return: the new damage list reflecting the changes
+        """
+        d = Dice.stream('combat').randint(self.min_damage, self.max_damage)
+        d = -d
+        return self.__choose_damage(damage, d, body_segment=body_segment)
+
+    @staticmethod
+    def poison_damage(strength=1):
+        """
+        Sets the poison variable to true in the damage list
+        :param strength: the strength of the poison from 1 to 64
+        :return: the new damage list reflecting the changes
+        """
+        damage = [0, 0, 0, 0, 0, True]
+        timer = 0
+        return damage, strength, timer
+
+
+class Foe(Animal, Attacker):
     """
     Class for every sprite that moves and does damage to the player
     """
+    tag = FOE
+
     def __init__(self, image_files, start_pos=(0, 0), speed=3):
         """
         Initializes the sprite
@@ -199,8 +340,7 @@ class Foe(Animal):
         self.keys = [False, False, False, False]
         self.count = 0
         self.turn = 0
-        self.min_damage = 2  # absolute value
-        self.max_damage = 6
+        Attacker.__init__(self)
 
     def __str__(self):
         """
@@ -340,104 +480,29 @@ class Foe(Animal):
         """
         self.keys = [True, False, False, True]
 
-    @staticmethod
-    def __choose_damage(damage, damage_amount, body_segment=-1):
-        """
-        Sets the damage list
-        :param damage: Takes the current damage list
-        :param damage_amount: amount of damage to be done
-        :param body_segment: specifies which body segment to damage
-        :return: the damage list
-        """
-        # remember, damage is negative!
-        if body_segment == -1:  # if random
-            r = random.randint(0, 4)  # inclusive
-            choose = r
-        else:
-            choose = body_segment
-
-        if choose == 0:
-            damage[0] = damage_amount
-        if choose == 1:
-            damage[1] = damage_amount
-        if choose == 2:
-            damage[2] = damage_amount
-        if choose == 3:
-            damage[3] = damage_amount
-        if choose == 4:
-            damage[4] = damage_amount
-        return damage
-
-    def damage_low_random(self, damage):
-        """
-        Preset damage type
-        :param damage: Takes the current damage list
-        :return: the new damage list reflecting the changes
-        """
-        d = random.randint(1, self.min_damage)
-        d = -d
-        return self.__choose_damage(damage, d)
-
-    def damage_high_random(self, damage):
-        """
-        Preset damage type
-        :param damage: Takes the current damage list
-        :return: the new damage list reflecting the changes
-        """
-        d = random.randint(self.min_damage, self.max_damage)
-        d = -d
-        return self.__choose_damage(damage, d)
-
-    def damage_low_accurate(self, damage, body_segment):
-        """
-        Preset damage type
-        :param damage: Takes the current damage list
-        :param body_segment: the number of the body segment to be damaged
-        :return: the new damage list reflecting the changes
-        """
-        d = random.randint(1, self.min_damage)
-        d = -d
-        return self.__choose_damage(damage, d, body_segment=body_segment)
-
-    def damage_high_accurate(self, damage, body_segment):
-        """
-        Preset damage type
-        :param damage: Takes the current damage list
-        :param body_segment: the number of the body segment to be damaged
-        :return: the new damage list reflecting the changes
-        """
-        d = random.randint(self.min_damage, self.max_damage)
-        d = -d
-        return self.__choose_damage(damage, d, body_segment=body_segment)
-
-    @staticmethod
-    def poison_damage(strength=1):
-        """
-        Sets the poison variable to true in the damage list
-        :param strength: the strength of the poison from 1 to 64
-        :return: the new damage list reflecting the changes
-        """
-        damage = [0, 0, 0, 0, 0, True]
-        timer = 0
-        return damage, strength, timer
-
 
 class Item(pygame.sprite.Sprite):
     """
     General class for sprite objects that stay stationary with the background
     """
-    def __init__(self, name, image_file, start_pos):
+    tag = ITEM
+
+    def __init__(self, name, image_file, start_pos, tag=None):
         """
         Initializing the sprite
         :param name: String to identify the sprite when it is in a group
         :param image_file: Path to the image
         :param start_pos: Initial starting coordinates list
+        :param tag: what kind of item it is, such as FIRE. ITEM if None
         """
         pygame.sprite.Sprite.__init__(self)
+        if tag is not None:
+            self.tag = tag
         self.image, self.rect = GPlay.load_image(image_file, -1)
         self.__position = [0, 0]  # current position as it moves with the background
         self.__start_pos = start_pos
         self.__name = name
+        self.spatial_hashes = []  # the SpatialHash objects to tell when it moves
 
     def update(self, background_pos):
         """
@@ -474,6 +539,25 @@ class Item(pygame.sprite.Sprite):
         :param pos: list of x, y coordinates
         """
         self.__start_pos = pos
+        for h in self.spatial_hashes:
+            h.update(self)
+
+    def get_world_rect(self):
+        """
+        :return: The rectangle of the sprite in background coordinates
+        """
+        rect = pygame.Rect(self.rect)
+        rect.center = self.get_start_position()
+        return rect
+
+    def reset(self, start_pos):
+        """
+        Puts the sprite back the way it was made at a new start position, so a Pool can use it again
+        :param start_pos: Initial starting coordinates list
+        """
+        self.rect.topleft = (0, 0)
+        self.__position = [0, 0]
+        self.set_start_position(start_pos)
 
     def __str__(self):
         """
@@ -486,7 +570,9 @@ class Food(Item):
     """
     General class for sprites that can be eaten
     """
-    def __init__(self, name, kind, image_file, start_pos, deviation=70):
+    tag = FOOD
+
+    def __init__(self, name, kind, image_file, start_pos, deviation=70, scatter=True):
         """
         Initializes the sprite in a random position around the start position
         :param name: string name of the object
@@ -494,13 +580,27 @@ class Food(Item):
         :param image_file: Path to the image file
         :param start_pos: List of start position coordinates
         :param deviation: Standard Deviation of the random position around the start_pos
+        :param scatter: when False it is put at the start position, such as one already made by MyGame.scatter
         """
         Item.__init__(self, name, image_file, [0, 0])
-        self.__set_rand_position(start_pos, deviation=deviation)
+        self.__deviation = deviation
+        if scatter:
+            self.__set_rand_position(start_pos, deviation=deviation)
+        else:
+            self.set_start_position(start_pos)
         self.eat = Eating()
         self.__kind = ""
         self.__set_kind(kind)
 
+    def reset(self, start_pos):
+        """
+        Puts the sprite back the way it was made in a new random position around the start position,
+        so a Pool can use it again
+        :param start_pos: List of start position coordinates
+        """
+        Item.reset(self, [0, 0])
+        self.__set_rand_position(start_pos, deviation=self.__deviation)
+
     def __set_rand_position(self, position, deviation=70):
         """
         Models the location of plants to each other in nature using a normal distribution from the given position.
@@ -511,8 +611,8 @@ class Food(Item):
         stdev = 1
         if deviation >= 0:
             stdev = deviation
-        rx = random.normalvariate(position[0], stdev)
-        ry = random.normalvariate(position[1], stdev)
+        rx = Dice.stream('spawn').normalvariate(position[0], stdev)
+        ry = Dice.stream('spawn').normalvariate(position[1], stdev)
         self.set_start_position([rx, ry])
 
     def get_kind(self):
@@ -526,7 +626,7 @@ class Food(Item):
         :param kind: a string that must be an official kind of food for the game
         :return: None or "Error: not an official kind of food"
         """
-        if kind in self.eat.kinds_of_food():
+        if kind in KINDS_OF_FOOD:
             self.__kind = kind
         else:
             return "Error: not an official kind of food"
@@ -538,15 +638,217 @@ class Food(Item):
         return self.get_kind() + " " + Item.__str__(self)
 
 
+class Pool(object):
+    """
+    Keeps the sprites that are no longer used so they are used again instead of making new ones in the middle of the
+    game, which loads images and leaves garbage to collect.
+    The sprites need a reset function taking the start position, like Item and Food.
+    """
+    def __init__(self, make):
+        """
+        Initializes the pool without any sprites
+        :param make: function without arguments that makes a new sprite, used when the pool is empty
+        """
+        self.__make = make
+        self.__free = []
+        self.__made = 0
+
+    def fill(self, number):
+        """
+        Makes sprites ahead of time, such as when the game starts, until the pool has the number of them
+        :param number: the number of sprites to have ready
+        """
+        while len(self.__free) < number:
+            self.__free.append(self.__make())
+            self.__made += 1
+
+    def get(self, start_pos):
+        """
+        :param start_pos: Initial starting coordinates list
+        :return: a sprite from the pool put at the start position, or a new one if the pool is empty
+        """
+        if self.__free:
+            sprite = self.__free.pop()
+        else:
+            sprite = self.__make()
+            self.__made += 1
+        sprite.reset(start_pos)
+        return sprite
+
+    def put(self, sprite):
+        """
+        Takes the sprite out of every group and keeps it to be used again
+        :param sprite: a sprite made by this pool
+        """
+        sprite.kill()
+        self.__free.append(sprite)
+
+    def get_free(self):
+        """
+        :return: The number of sprites ready to be used
+        """
+        return len(self.__free)
+
+    def get_made(self):
+        """
+        :return: The number of sprites the pool has made
+        """
+        return self.__made
+
+
 class Group(pygame.sprite.Group):
     """
     Provides a shorthand notation for the Group object which can hold many sprites
+    Can keep its sprites in a SpatialHash so finding the ones touching a rectangle is quick.
+    Can update and draw only the sprites near the window. These are drawn in the order they were added.
+    Its sprites are always given in the order they were added, not the order of their memory addresses, so the same
+    seed plays the same game.
+    The sprites are also kept apart by their tag, so the sprites of one kind are found without looking at the others.
     """
-    def __init__(self):
+    def __init__(self, cell_size=None):
         """
         initializes the Group object
-        """
+        :param cell_size: the size of the SpatialHash cells. No SpatialHash is used if set to None
+        """
+        self.__spatial = None
+        if cell_size is not None:
+            self.__spatial = Spatial.SpatialHash(cell_size)
+        self.__order = {}  # sprite: number counting up in the order they were added
+        self.__added = 0
+        self.__tagged = {}  # tag: OrderedDict of its sprites in the order they were added
+        self.__visible = []  # the sprites near the window in the order they were added
+        self.__shown = set()  # the same sprites, so a removed one is found without going through the list
+        self.__hidden = False  # whether a sprite was removed from __shown but is still in __visible
+        self.__tested = 0  # rectangles compared without a SpatialHash
         pygame.sprite.Group.__init__(self)
+        self.spritedict = collections.OrderedDict()  # used by pygame for the sprites
+
+    def add_internal(self, sprite):
+        """
+        Called by pygame when a sprite is added
+        """
+        pygame.sprite.Group.add_internal(self, sprite)
+        self.__order[sprite] = self.__added
+        self.__added += 1
+        tag = getattr(sprite, 'tag', None)
+        if tag not in self.__tagged:
+            self.__tagged[tag] = collections.OrderedDict()
+        self.__tagged[tag][sprite] = None
+        if self.__spatial is not None:
+            self.__spatial.insert(sprite)
+
+    def remove_internal(self, sprite):
+        """
+        Called by pygame when a sprite is removed
+        """
+        pygame.sprite.Group.remove_internal(self, sprite)
+        del self.__order[sprite]
+        del self.__tagged[getattr(sprite, 'tag', None)][sprite]
+        if sprite in self.__shown:
+            self.__shown.remove(sprite)
+            self.__hidden = True  # taken out of __visible the next time it is used
+        if self.__spatial is not None:
+            self.__spatial.remove(sprite)
+
+    def get_tagged(self, tag):
+        """
+        :param tag: what kind of sprite, such as PUDDLE
+        :return: list of the sprites with the tag in the order they were added
+        """
+        if tag in self.__tagged:
+            return list(self.__tagged[tag])
+        return []
+
+    def has_tag(self, tag):
+        """
+        :param tag: what kind of sprite, such as FOOD
+        :return: A boolean representing whether any sprite in the group has the tag
+        """
+        return tag in self.__tagged and len(self.__tagged[tag]) > 0
+
+    def cull(self, area):
+        """
+        Finds the sprites near the window and remembers them for draw_visible
+        :param area: rectangle in background coordinates, usually from Viewer.get_cull_rect
+        :return: list of the sprites touching the area in the order they were added
+        """
+        self.__show(self.collide(area))  # already in the order they were added
+        return self.__visible
+
+    def update_visible(self, background_pos, area):
+        """
+        Moves only the sprites near the window with the background. The others keep their background coordinates and
+        are not moved until they come near.
+        :param background_pos: Coordinates of the background
+        :param area: rectangle in background coordinates, usually from Viewer.get_cull_rect
+        """
+        for spr in self.cull(area):
+            spr.update(background_pos)
+
+    def get_visible(self):
+        """
+        :return: list of the sprites found near the window by the last cull
+        """
+        if self.__hidden:
+            self.__visible = [spr for spr in self.__visible if spr in self.__shown]
+            self.__hidden = False
+        return self.__visible
+
+    def show(self, sprites):
+        """
+        Remembers the sprites for draw_visible instead of cull, when the ones near the window are found some other way
+        such as by the FoeEngine
+        :param sprites: list of its sprites in the order they were added. It is copied, so it can be changed later
+        """
+        self.__show(list(sprites))
+
+    def __show(self, sprites):
+        """
+        Remembers the sprites near the window
+        :param sprites: list of the sprites in the order they were added, which the group keeps
+        """
+        self.__visible = sprites
+        self.__shown = set(sprites)
+        self.__hidden = False
+
+    def draw_visible(self, surface, offset=None):
+        """
+        Draws only the sprites found near the window by the last cull
+        :param surface: the screen
+        :param offset: x, y distance to draw the sprites from their rectangles, such as between two ticks
+        :return: the number of sprites drawn
+        """
+        blit = surface.blit
+        visible = self.get_visible()
+        if offset is None:
+            for spr in visible:
+                blit(spr.image, spr.rect)
+        else:
+            for spr in visible:
+                blit(spr.image, spr.rect.move(offset))
+        return len(visible)
+
+    def collide(self, rect):
+        """
+        Finds the sprites touching the rectangle
+        :param rect: rectangle in background coordinates
+        :return: list of sprites in the order they were added
+        """
+        if self.__spatial is not None:
+            found = self.__spatial.query(rect)
+            if len(found) > 1:
+                found.sort(key=self.__order.get)
+            return found
+        self.__tested += len(self)
+        return [spr for spr in self.sprites() if rect.colliderect(spr.get_world_rect())]
+
+    def get_tested(self):
+        """
+        :return: The integer number of rectangles compared by collide since the group was made
+        """
+        if self.__spatial is not None:
+            return self.__tested + self.__spatial.get_tested()
+        return self.__tested
 
 
 class Eating(object):
@@ -564,57 +866,81 @@ class Eating(object):
     def kinds_of_food():
         """
         Sets the names of the kinds of food available
-        :return: List of strings
-        """
-        return ['fruit', 'root', 'grain', 'vegetable', 'meat']
+        :return: tuple of strings
+        """
+        return KINDS_OF_FOOD
+
+    def heal_lists(self, kind):
+        """
+        The healing a kind of food does, without needing a character to heal, such as for balancing the game
+        :param kind: one of the kinds of food
+        :return: list of the healing lists of the 5 body segments in the order they are applied. The random benefit
+            of a vegetable is chosen each time
+        """
+        low = self.min_heal
+        high = self.max_heal
+        if kind == 'fruit':  # legs and head
+            return [[low, 0, 0, 0, high]]
+        if kind == 'root':  # head and both arms
+            return [[high, 0, low, low, 0]]
+        if kind == 'grain':  # both arms and legs
+            return [[0, 0, high, high, low]]
+        if kind == 'vegetable':  # the torso and a random body segment
+            benefit = Dice.stream('food').randint(0, 5)
+            healing = [0, 0, 0, 0, 0]
+            if benefit == 0:
+                healing[GPlay.LEGS] = high
+            elif benefit == 1:
+                healing[GPlay.HEAD] = high
+            elif benefit == 2:
+                healing[GPlay.RIGHT_ARM] = high
+            elif benefit == 3:
+                healing[GPlay.LEFT_ARM] = high
+            elif benefit == 4 or benefit == 5:
+                healing[GPlay.TORSO] = high
+            return [[0, low, 0, 0, 0], healing]
+        if kind == 'meat':  # torso
+            return [[0, high, 0, 0, 0]]
+        return []
+
+    def __heal(self, subject, kind):
+        """
+        Applies the healing of the kind of food to the subject
+        """
+        for healing in self.heal_lists(kind):
+            subject.health.apply(healing=healing)
 
     def fruit(self, subject):
         """
         Heals the subject's legs and head
         :param subject: usually the main character
         """
-        subject.health.heal_legs(self.max_heal)
-        subject.health.heal_head(self.min_heal)
+        self.__heal(subject, 'fruit')
 
     def root(self, subject):
         """
         Heals the subject's head and both arms
         :param subject: usually the main character
         """
-        subject.health.heal_head(self.max_heal)
-        subject.health.heal_both_arms(self.min_heal)
+        self.__heal(subject, 'root')
 
     def grain(self, subject):
         """
         Heals the subject's both arms and legs
         :param subject: usually the main character
         """
-        subject.health.heal_both_arms(self.max_heal)
-        subject.health.heal_legs(self.min_heal)
+        self.__heal(subject, 'grain')
 
     def vegetable(self, subject):
         """
         Heals the subject's a random body segment and the torso
         :param subject: usually the main character
         """
-        subject.health.heal_torso(self.min_heal)
-
-        # random benefit
-        benefit = random.randint(0, 5)
-        if benefit == 0:
-            subject.health.heal_legs(self.max_heal)
-        elif benefit == 1:
-            subject.health.heal_head(self.max_heal)
-        elif benefit == 2:
-            subject.health.heal_right_arm(self.max_heal)
-        elif benefit == 3:
-            subject.health.heal_left_arm(self.max_heal)
-        elif benefit == 4 or benefit == 5:
-            subject.health.heal_torso(self.max_heal)
+        self.__heal(subject, 'vegetable')
 
     def meat(self, subject):  # not currently used
         """
         Heals the subject's torso
         :param subject: usually the main character
         """
-        subject.health.heal_torso(self.max_heal)
\ No newline at end of file
+        self.__heal(subject, 'meat')
@@ -0,0 +1,364 @@
+__author__ = 'ElectroNick'
+
+import array
+import collections
+import json
+import sys
+import timeit
+
+
+class PhaseTimer(object):
+    """
+    Measures how long each phase of a frame takes, such as handling input or drawing.
+    The main loop calls mark with the name of each phase as it starts, so every phase ends when the next one starts.
+    When it is not enabled the functions return straight away.
+    """
+    def __init__(self, enabled=True):
+        """
+        Initializes the timer without any frames
+        :param enabled: when False nothing is measured
+        """
+        self.__enabled = enabled
+        self.__clock = timeit.default_timer  # the most accurate clock for the operating system
+        self.__created = self.__clock()
+        self.__setup = 0.0
+        self.__phases = []  # phase names in the order they were first used
+        self.__times = {}  # phase name: array of seconds for each frame
+        self.__frames = array.array('d')  # seconds for each whole frame
+        self.__frame = {}  # phase name: seconds in the current frame
+        self.__last = {}  # phase name: seconds in the last frame measured
+        self.__phase = None
+        self.__phase_start = 0.0
+        self.__frame_start = None
+
+    def get_enabled(self):
+        """
+        :return: A boolean representing whether the timer is measuring
+        """
+        return self.__enabled
+
+    def set_enabled(self, on):
+        """
+        Turns measuring on or off. The frame being measured is dropped when it is turned off.
+        """
+        self.__enabled = on
+        if not on:
+            self.__frame_start = None
+
+    def get_clock(self):
+        """
+        :return: the function used to read the clock in seconds
+        """
+        return self.__clock
+
+    def setup_done(self):
+        """
+        Records how long it took from making the timer until the first frame, such as loading the game
+        """
+        if self.__enabled:
+            self.__setup = self.__clock() - self.__created
+
+    def start_frame(self):
+        """
+        Starts measuring a new frame
+        """
+        if self.__enabled:
+            self.__frame_start = self.__phase_start = self.__clock()
+            self.__phase = None
+            self.__frame = {}
+
+    def __use(self, phase):
+        """
+        Remembers the phase name the first time it is used
+        """
+        if phase not in self.__times:
+            self.__phases.append(phase)
+            self.__times[phase] = array.array('d', [0.0] * len(self.__frames))  # the frames before it was first used
+
+    def mark(self, phase):
+        """
+        Ends the current phase and starts the named one
+        :param phase: string naming the phase
+        """
+        if self.__enabled and self.__frame_start is not None:
+            now = self.__clock()
+            if self.__phase is not None:
+                self.__frame[self.__phase] = self.__frame.get(self.__phase, 0.0) + now - self.__phase_start
+            self.__use(phase)
+            self.__phase = phase
+            self.__phase_start = now
+
+    def add(self, name, seconds):
+        """
+        Adds time to a named part of the current frame without ending the current phase, such as for a Scope
+        :param name: string naming the part of the frame
+        :param seconds: the time to add
+        """
+        if self.__enabled and self.__frame_start is not None:
+            self.__use(name)
+            self.__frame[name] = self.__frame.get(name, 0.0) + seconds
+
+    def end_frame(self):
+        """
+        Ends the current phase and the frame
+        """
+        if self.__enabled and self.__frame_start is not None:
+            now = self.__clock()
+            if self.__phase is not None:
+                self.__frame[self.__phase] = self.__frame.get(self.__phase, 0.0) + now - self.__phase_start
+            for phase in self.__phases:
+                self.__times[phase].append(self.__frame.get(phase, 0.0))
+            self.__frames.append(now - self.__frame_start)
+            self.__last = self.__frame
+            self.__frame_start = None
+            self.__phase = None
+
+    def get_frame_count(self):
+        """
+        :return: The number of frames measured
+        """
+        return len(self.__frames)
+
+    def get_phases(self):
+        """
+        :return: The list of phase names in the order they were first used
+        """
+        return list(self.__phases)
+
+    def get_times(self, phase=None):
+        """
+        :param phase: string naming the phase. The whole frames if None
+        :return: array of the seconds for each frame measured
+        """
+        if phase is None:
+            return self.__frames
+        return self.__times.get(phase, array.array('d'))
+
+    def get_last_frame(self):
+        """
+        :return: The seconds of the last frame measured and a dictionary of the seconds of each of its phases
+        """
+        if not self.__frames:
+            return 0.0, {}
+        return self.__frames[-1], self.__last
+
+    def results(self):
+        """
+        :return: Dictionary of the setup seconds and, for the whole frame and each phase, the total, mean and largest
+            seconds and the 50th, 95th and 99th percentiles
+        """
+        phases = {}
+        for phase in self.__phases:
+            phases[phase] = summary(self.__times[phase])
+        return {'setup': self.__setup, 'frames': len(self.__frames), 'frame': summary(self.__frames),
+                'phases': phases, 'order': self.get_phases()}
+
+
+class Scope(object):
+    """
+    Times the code inside a with statement and adds it to a PhaseTimer under its name
+    """
+    def __init__(self, timer, name):
+        """
+        :param timer: PhaseTimer object to add the time to
+        :param name: string naming the part of the frame
+        """
+        self.__timer = timer
+        self.__name = name
+        self.__clock = timer.get_clock()
+        self.__start = 0.0
+
+    def __enter__(self):
+        self.__start = self.__clock()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.__timer.add(self.__name, self.__clock() - self.__start)
+        return False
+
+
+class NoScope(object):
+    """
+    Used in place of a Scope when nothing is measured, so a with statement costs almost nothing
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        return False
+
+
+NO_SCOPE = NoScope()
+
+
+class Profiler(PhaseTimer):
+    """
+    A PhaseTimer that can also time named scopes inside the phases, count things that happen each frame such as
+    blits, and keep the times and counts of the last frames to show on the screen while playing.
+    Everything it measures can be written to a trace file to compare with other runs.
+    """
+    def __init__(self, enabled=False, window=300):
+        """
+        Initializes the profiler without any frames
+        :param enabled: when False nothing is measured or counted
+        :param window: the number of most recent frames used for the percentiles shown on the screen
+        """
+        PhaseTimer.__init__(self, enabled)
+        self.__window = max(1, window)
+        self.__counters = []  # counter names in the order they were first used
+        self.__counted = {}  # counter name: array of the count for each frame
+        self.__counts = {}  # counter name: count in the current frame
+        self.__recent = {}  # phase or counter name: the values of the last frames
+
+    def scope(self, name):
+        """
+        Times the code inside a with statement, such as: with profiler.scope('background'):
+        :param name: string naming the part of the frame
+        :return: Scope object, or NO_SCOPE when not enabled
+        """
+        if self.get_enabled():
+            return Scope(self, name)
+        return NO_SCOPE
+
+    def count(self, name, number=1):
+        """
+        Adds to a counter for the current frame
+        :param name: string naming the counter, such as 'blits'
+        :param number: how much to add
+        """
+        if self.get_enabled():
+            if name not in self.__counted:
+                self.__counters.append(name)
+                self.__counted[name] = array.array('l', [0] * self.get_frame_count())
+            self.__counts[name] = self.__counts.get(name, 0) + number
+
+    def __remember(self, name, value):
+        """
+        Keeps the value of the last frames for the percentiles shown on the screen
+        """
+        recent = self.__recent.get(name)
+        if recent is None:
+            recent = self.__recent[name] = collections.deque(maxlen=self.__window)
+        recent.append(value)
+
+    def end_frame(self):
+        """
+        Ends the current phase and the frame, keeping its counts
+        """
+        frames = self.get_frame_count()
+        PhaseTimer.end_frame(self)
+        if self.get_frame_count() > frames:  # the frame was measured
+            seconds, phases = self.get_last_frame()
+            self.__remember('frame', seconds)
+            for phase in self.get_phases():
+                self.__remember(phase, phases.get(phase, 0.0))
+            for name in self.__counters:
+                self.__counted[name].append(self.__counts.get(name, 0))
+                self.__remember(name, self.__counts.get(name, 0))
+        self.__counts = {}
+
+    def get_counters(self):
+        """
+        :return: The list of counter names in the order they were first used
+        """
+        return list(self.__counters)
+
+    def recent(self, name='frame'):
+        """
+        :param name: 'frame', a phase name or a counter name
+        :return: dictionary from summary of the values of the last frames
+        """
+        return summary(self.__recent.get(name, ()))
+
+    def overlay(self):
+        """
+        :return: list of strings showing the recent frame and phase milliseconds and the counts, to draw on the screen
+        """
+        frame = self.recent()
+        fps = 1 / frame['mean'] if frame['mean'] else 0
+        lines = ['%.0f fps   frame ms: %.2f  %.2f  %.2f' % (fps, frame['p50'] * 1000, frame['p95'] * 1000,
+                                                          frame['p99'] * 1000)]
+        lines.append('(50th, 95th and 99th percentiles)')
+        for phase in self.get_phases():
+            times = self.recent(phase)
+            lines.append('%s: %.2f  %.2f  %.2f' % (phase, times['p50'] * 1000, times['p95'] * 1000,
+                                                   times['p99'] * 1000))
+        for name in self.__counters:
+            lines.append('%s: %.0f a frame' % (name, self.recent(name)['mean']))
+        return lines
+
+    def results(self):
+        """
+        :return: Dictionary from PhaseTimer.results with a summary of each counter added
+        """
+        results = PhaseTimer.results(self)
+        results['counters'] = dict((name, summary(self.__counted[name])) for name in self.__counters)
+        return results
+
+    def dump(self, file_name):
+        """
+        Writes a trace file with the results and the time of every phase and the count of every counter in every frame
+        :param file_name: path of the JSON file to write
+        """
+        trace = {'results': self.results(),
+                 'frames': self.get_times().tolist(),
+                 'phases': dict((phase, self.get_times(phase).tolist()) for phase in self.get_phases()),
+                 'counters': dict((name, self.__counted[name].tolist()) for name in self.__counters)}
+        with open(file_name, 'w') as out:
+            json.dump(trace, out, sort_keys=True)
+
+
+def percentile(ordered, p):
+    """
+    :param ordered: a sorted list of numbers
+    :param p: the percentile from 0 to 100
+    :return: the number below which p percent of the numbers fall. 0 if the list is empty
+    """
+    if not ordered:
+        return 0.0
+    i = int(round((len(ordered) - 1) * p / 100.0))
+    return ordered[i]
+
+
+def summary(times):
+    """
+    :param times: list of seconds
+    :return: dictionary of the total, mean, max, p50, p95 and p99 seconds
+    """
+    ordered = sorted(times)
+    total = sum(ordered)
+    return {'total': total, 'mean': float(total) / len(ordered) if ordered else 0.0,
+            'max': ordered[-1] if ordered else 0.0,
+            'p50': percentile(ordered, 50), 'p95': percentile(ordered, 95), 'p99': percentile(ordered, 99)}
+
+
+def compare(old, new):
+    """
+    Compares the mean milliseconds of the whole frame and each phase, and the mean of each counter
+    :param old: dictionary from PhaseTimer.results of an earlier run
+    :param new: dictionary from PhaseTimer.results
+    :return: list of strings, one for each phase or counter in both
+    """
+    lines = []
+    for phase in new['order'] + ['frame']:
+        now = new['frame'] if phase == 'frame' else new['phases'][phase]
+        then = old['frame'] if phase == 'frame' else old['phases'].get(phase)
+        if then and then['mean'] > 0:
+            change = (now['mean'] - then['mean']) / then['mean'] * 100
+            lines.append('%-18s %8.3f ms -> %8.3f ms  %+6.1f%%' % (phase, then['mean'] * 1000, now['mean'] * 1000,
+                                                                   change))
+    for name, now in sorted(new.get('counters', {}).items()):
+        then = old.get('counters', {}).get(name)
+        if then:
+            lines.append('%-18s %8.1f    -> %8.1f' % (name, then['mean'], now['mean']))
+    return lines
+
+
+# Compares two trace files: python MyGame_profile.py old.json new.json
+if __name__ == '__main__':
+    with open(sys.argv[1]) as f:
+        before = json.load(f)['results']
+    with open(sys.argv[2]) as f:
+        after = json.load(f)['results']
+    for line in compare(before, after):
+        print line
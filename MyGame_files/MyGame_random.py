@@ -0,0 +1,166 @@
+__author__ = 'ElectroNick'
+
+import hashlib
+import os
+import random
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The parts of the game that use random numbers. Each has its own stream so using more random numbers in one part,
+# such as more foes, does not change the random numbers of the others
+STREAMS = ['spawn', 'combat', 'poison', 'food', 'fire', 'map']
+
+# The generators the batches of numbers can come from. The same seed gives different numbers from each, so the same
+# seed plays a different game with numpy than without it
+GENERATORS = ['random', 'numpy']
+
+
+class Streams(object):
+    """
+    Independent streams of random numbers made from one seed, so the same seed always makes the same game.
+    stream gives a random.Random for single numbers and ints and normals give many numbers at once,
+    using numpy when it is installed.
+    With numpy the batches come from a numpy RandomState and without it from the random.Random of the stream. These
+    give different numbers for the same seed, so the same seed only plays the same game where get_generator is the same.
+    """
+    def __init__(self, seed=None):
+        """
+        Initializes a stream for each name in STREAMS
+        :param seed: integer seed. A random one if None
+        """
+        self.__seed = None
+        self.__streams = {}  # name: random.Random
+        self.__batches = {}  # name: numpy RandomState
+        self.seed(seed)
+
+    def __stream_seed(self, name):
+        """
+        :return: the seed of the named stream, made from the seed and the name so every stream is different
+        """
+        return int(hashlib.md5('%d:%s' % (self.__seed, name)).hexdigest()[:8], 16)
+
+    def __add(self, name):
+        """
+        Makes the named stream
+        """
+        self.__streams[name] = random.Random(self.__stream_seed(name))
+        if numpy is not None:
+            self.__batches[name] = numpy.random.RandomState(self.__stream_seed(name))
+
+    def seed(self, seed=None):
+        """
+        Starts every stream again from a new seed. The streams already handed out keep working with the new seed.
+        :param seed: integer seed. A random one if None
+        """
+        if seed is None:
+            seed = int(os.urandom(4).encode('hex'), 16)
+        self.__seed = seed
+        for name in set(STREAMS) | set(self.__streams):
+            if name in self.__streams:
+                self.__streams[name].seed(self.__stream_seed(name))
+                if numpy is not None:
+                    self.__batches[name].seed(self.__stream_seed(name))
+            else:
+                self.__add(name)
+
+    def get_seed(self):
+        """
+        :return: the integer seed of the streams, to be able to play the same game again
+        """
+        return self.__seed
+
+    def get_generator(self):
+        """
+        :return: the name of the generator ints and normals draw from, one of GENERATORS
+        """
+        if numpy is None:
+            return 'random'
+        return 'numpy'
+
+    def stream(self, name):
+        """
+        :param name: the part of the game, such as 'combat'
+        :return: random.Random object for the named part of the game
+        """
+        if name not in self.__streams:
+            self.__add(name)
+        return self.__streams[name]
+
+    def batch(self, name):
+        """
+        :param name: the part of the game, such as 'spawn'
+        :return: numpy RandomState object for the named part of the game, or None without numpy
+        """
+        if name not in self.__streams:
+            self.__add(name)
+        return self.__batches.get(name)
+
+    def ints(self, name, low, high, size):
+        """
+        :param name: the part of the game
+        :param low: the smallest integer
+        :param high: the largest integer, included like random.randint
+        :param size: how many integers
+        :return: numpy array of the integers, or a list without numpy
+        """
+        if numpy is None:
+            r = self.stream(name)
+            return [r.randint(low, high) for n in xrange(size)]
+        return self.batch(name).randint(low, high + 1, size=size)
+
+    def normals(self, name, mean, stdev, size):
+        """
+        :param name: the part of the game
+        :param mean: the middle of the normal distribution
+        :param stdev: its standard deviation
+        :param size: how many numbers
+        :return: numpy array of the numbers, or a list without numpy
+        """
+        if numpy is None:
+            r = self.stream(name)
+            return [r.normalvariate(mean, stdev) for n in xrange(size)]
+        return self.batch(name).normal(mean, stdev, size=size)
+
+
+streams = Streams()  # the streams used by the game
+
+
+def seed(value=None):
+    """
+    Starts the streams of the game again from a new seed
+    :param value: integer seed. A random one if None
+    :return: the seed used
+    """
+    streams.seed(value)
+    return streams.get_seed()
+
+
+def generator():
+    """
+    :return: the name of the generator the batches of the game are drawn from, one of GENERATORS
+    """
+    return streams.get_generator()
+
+
+def stream(name):
+    """
+    :param name: the part of the game, such as 'combat'
+    :return: random.Random object for the named part of the game
+    """
+    return streams.stream(name)
+
+
+def ints(name, low, high, size):
+    """
+    Many random integers from low to high inclusive at once from the named stream, see Streams.ints
+    """
+    return streams.ints(name, low, high, size)
+
+
+def normals(name, mean, stdev, size):
+    """
+    Many normally distributed random numbers at once from the named stream, see Streams.normals
+    """
+    return streams.normals(name, mean, stdev, size)
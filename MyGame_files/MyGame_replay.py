@@ -0,0 +1,199 @@
+__author__ = 'ElectroNick'
+
+import struct
+import zlib
+import pygame
+import MyGame_game_play as GPlay
+import MyGame_random as Dice
+
+# A recording file starts with the header, then the events and then the checks:
+# header: 'CFRL', version, generator, seed, number_foes, number_plants, frames, number of events, number of checks
+HEADER = struct.Struct('<4sBBqHHIII')
+EVENT = struct.Struct('<IBH')  # frame, kind of event, key
+CHECK = struct.Struct('<II')  # frame, world state
+MAGIC = 'CFRL'
+# changed whenever a recording made before can not be played again:
+# 2: the same seed places the plants, foes and mud differently
+# 3: the plants, foes, mud and puddles are placed apart from each other
+# 4: the header says which generator the random numbers came from, as its index in Dice.GENERATORS
+VERSION = 4
+
+# The kinds of events recorded, in the order they are numbered in the file
+EVENT_TYPES = [pygame.KEYDOWN, pygame.KEYUP, pygame.QUIT]
+
+
+def world_state(frame, health, groups):
+    """
+    Sums up the game in one number, so a replay can be checked against the recording
+    :param frame: the number of the frame
+    :param health: Health object of the main character
+    :param groups: list of sprite groups. Only where their sprites are counts, not the order they are kept in
+    :return: integer checksum of the frame, the health and the rectangles of every sprite
+    """
+    state = [frame] + [health.get_segment_health(segment) for segment in GPlay.SEGMENTS]
+    for group in groups:
+        state.append(sorted(tuple(sprite.rect) for sprite in group))
+    return zlib.crc32(repr(state)) & 0xffffffff
+
+
+class Recorder(object):
+    """
+    Records the seed, the settings and every key press of a game, with a check of the world state every second,
+    so the game can be played again exactly with a Recording
+    """
+    def __init__(self):
+        """
+        Initializes the recorder without any frames
+        """
+        self.__seed = 0
+        self.__generator = Dice.generator()
+        self.__number_foes = 0
+        self.__number_plants = 0
+        self.__frame = 0
+        self.__events = []  # (frame, kind of event, key)
+        self.__checks = []  # (frame, world state)
+
+    def start(self, seed, number_foes, number_plants):
+        """
+        Remembers the settings the game was started with
+        :param seed: integer seed of the random numbers
+        :param number_foes: the number of each kind of foe
+        :param number_plants: the number of each kind of plant
+        """
+        self.__seed = seed
+        self.__generator = Dice.generator()
+        self.__number_foes = number_foes
+        self.__number_plants = number_plants
+
+    def start_frame(self, frame):
+        """
+        :param frame: the number of the frame starting at 1
+        """
+        self.__frame = frame
+
+    def add(self, event):
+        """
+        Records the event if it is a key press, a key release or closing the window
+        :param event: pygame event
+        """
+        if event.type in EVENT_TYPES:
+            self.__events.append((self.__frame, EVENT_TYPES.index(event.type), getattr(event, 'key', 0)))
+
+    def check(self, state):
+        """
+        Records the world state of the current frame
+        :param state: integer returned by world_state
+        """
+        self.__checks.append((self.__frame, state))
+
+    def get_frames(self):
+        """
+        :return: The number of the last frame recorded
+        """
+        return self.__frame
+
+    def get_checks(self):
+        """
+        :return: list of (frame, world state)
+        """
+        return list(self.__checks)
+
+    def save(self, file_name):
+        """
+        Writes the recording to a file
+        :param file_name: path of the file to write
+        """
+        parts = [HEADER.pack(MAGIC, VERSION, Dice.GENERATORS.index(self.__generator), self.__seed,
+                             self.__number_foes, self.__number_plants, self.__frame, len(self.__events),
+                             len(self.__checks))]
+        parts.extend(EVENT.pack(*event) for event in self.__events)
+        parts.extend(CHECK.pack(*check) for check in self.__checks)
+        with open(file_name, 'wb') as out:
+            out.write(''.join(parts))
+
+
+class Recording(object):
+    """
+    A recording loaded from a file made by a Recorder.
+    It can only be played where the random numbers come from the same generator as when it was recorded, since the
+    same seed plays a different game with another one.
+    """
+    def __init__(self, file_name):
+        """
+        Loads the recording
+        :param file_name: path of the file to read
+        """
+        with open(file_name, 'rb') as f:
+            data = f.read()
+        magic, version, generator, seed, number_foes, number_plants, frames, events, checks = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or generator >= len(Dice.GENERATORS):
+            raise ValueError(file_name + ' is not a recording of this version of the game')
+        recorded = Dice.GENERATORS[generator]
+        if recorded != Dice.generator():
+            raise ValueError(file_name + ' was recorded with random numbers from ' + recorded + ' but this game draws '
+                             'them from ' + Dice.generator() + ', which plays a different game')
+        self.__seed = seed
+        self.__number_foes = number_foes
+        self.__number_plants = number_plants
+        self.__frames = frames
+        offset = HEADER.size
+        self.__events = []
+        for e in range(events):
+            self.__events.append(EVENT.unpack_from(data, offset))
+            offset += EVENT.size
+        self.__checks = []
+        for c in range(checks):
+            self.__checks.append(CHECK.unpack_from(data, offset))
+            offset += CHECK.size
+
+    def get_seed(self):
+        """
+        :return: the integer seed of the random numbers
+        """
+        return self.__seed
+
+    def get_settings(self):
+        """
+        :return: dictionary of the settings to pass to main
+        """
+        return {'seed': self.__seed, 'number_foes': self.__number_foes, 'number_plants': self.__number_plants}
+
+    def get_frames(self):
+        """
+        :return: The number of frames recorded
+        """
+        return self.__frames
+
+    def get_checks(self):
+        """
+        :return: list of (frame, world state)
+        """
+        return list(self.__checks)
+
+    def get_script(self):
+        """
+        :return: ScriptedInput object that presses the recorded keys at the same frames
+        """
+        script = GPlay.ScriptedInput()
+        for frame, kind, key in self.__events:
+            if EVENT_TYPES[kind] == pygame.KEYDOWN:
+                script.press(frame, key)
+            elif EVENT_TYPES[kind] == pygame.KEYUP:
+                script.release(frame, key)
+            else:
+                script.quit(frame)
+        return script
+
+    def compare(self, checks):
+        """
+        :param checks: list of (frame, world state) from a Recorder that played the recording again
+        :return: The first frame where the world state is different, or None if they are all the same
+        """
+        for recorded, played in zip(self.__checks, checks):
+            if recorded != played:
+                return recorded[0]
+        if len(checks) > len(self.__checks):  # the replay lasted longer
+            return checks[len(self.__checks)][0]
+        if len(checks) < len(self.__checks):
+            return self.__checks[len(checks)][0]
+        return None
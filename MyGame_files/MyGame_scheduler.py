@@ -0,0 +1,93 @@
+__author__ = 'ElectroNick'
+
+import heapq
+
+
+class Scheduler(object):
+    """
+    Timers counted in ticks of the game, such as how long the player can run or when the next fire starts.
+    The timers are kept in a heap ordered by when they are due, so each tick only looks at the timers that are due
+    however many are waiting. A timer can call a function when it is due, and either way its name is given back by
+    advance so the main loop can act on it.
+    """
+    def __init__(self):
+        """
+        Initializes the scheduler at tick 0 without any timers
+        """
+        self.__tick = 0
+        self.__heap = []  # (due tick, number, name) with old entries left in until they come up
+        self.__timers = {}  # name: (due tick, number, repeat ticks, function, arguments)
+        self.__count = 0  # numbers each timer so the ones due at the same tick are in the order they were set
+
+    def get_tick(self):
+        """
+        :return: The number of ticks advanced
+        """
+        return self.__tick
+
+    def schedule(self, name, ticks, every=0, callback=None, args=()):
+        """
+        Sets a timer, replacing any timer with the same name
+        :param name: string naming the timer
+        :param ticks: the number of ticks from now that it is due. At least 1
+        :param every: when more than 0 it is due again this many ticks after each time it is due
+        :param callback: function called when it is due. Nothing is called if None
+        :param args: tuple of arguments for the function
+        """
+        self.__count += 1
+        due = self.__tick + max(1, int(ticks))
+        self.__timers[name] = (due, self.__count, every, callback, args)
+        heapq.heappush(self.__heap, (due, self.__count, name))
+
+    def cancel(self, name):
+        """
+        Stops the named timer if it is set
+        """
+        self.__timers.pop(name, None)  # its entry in the heap is skipped when it comes up
+
+    def is_scheduled(self, name):
+        """
+        :return: A boolean representing whether the named timer is set
+        """
+        return name in self.__timers
+
+    def get_remaining(self, name):
+        """
+        :return: The number of ticks until the named timer is due, or None if it is not set
+        """
+        timer = self.__timers.get(name)
+        if timer is None:
+            return None
+        return timer[0] - self.__tick
+
+    def advance(self):
+        """
+        Moves on one tick and calls the functions of the timers that are due
+        :return: list of the names of the timers due at this tick, in the order they were set
+        """
+        self.__tick += 1
+        due = []
+        heap = self.__heap
+        while heap and heap[0][0] <= self.__tick:
+            tick, number, name = heapq.heappop(heap)
+            timer = self.__timers.get(name)
+            if timer is None or timer[1] != number:  # cancelled or set again
+                continue
+            every, callback, args = timer[2:]
+            if every > 0:
+                self.__count += 1
+                self.__timers[name] = (tick + every, self.__count, every, callback, args)
+                heapq.heappush(heap, (tick + every, self.__count, name))
+            else:
+                del self.__timers[name]
+            due.append(name)
+            if callback is not None:
+                callback(*args)
+        return due
+
+    def clear(self):
+        """
+        Stops every timer
+        """
+        self.__heap = []
+        self.__timers = {}
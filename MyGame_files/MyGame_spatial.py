@@ -0,0 +1,351 @@
+__author__ = 'ElectroNick'
+
+import pygame
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class SpatialHash(object):
+    """
+    Divides the background into a grid of square cells and remembers which sprites touch each cell,
+    so finding the sprites that overlap a rectangle only looks at the sprites in the cells near it.
+    Sprites must have a get_world_rect function returning their rectangle in background coordinates and a
+    spatial_hashes list so they can tell this object when they move.
+    """
+    def __init__(self, cell_size=200):
+        """
+        Initializes the empty grid
+        :param cell_size: width and height of each cell in pixels. Works best a little larger than the sprites
+        """
+        self.__cell_size = max(1, int(cell_size))
+        self.__cells = {}  # (x, y): set of the sprites touching the cell
+        self.__sprites = {}  # sprite: (range of cells, rectangle in background coordinates)
+        self.__tested = 0
+
+    def get_cell_size(self):
+        """
+        :return: The integer width and height of each cell in pixels
+        """
+        return self.__cell_size
+
+    def get_tested(self):
+        """
+        :return: The integer number of rectangles compared by query since the grid was made
+        """
+        return self.__tested
+
+    def __range(self, rect):
+        """
+        :param rect: rectangle in background coordinates
+        :return: the first and last columns and rows of the cells touching the rectangle
+        """
+        c = self.__cell_size
+        return (rect.left // c, rect.top // c,
+                (rect.left + max(rect.width, 1) - 1) // c, (rect.top + max(rect.height, 1) - 1) // c)
+
+    def __add_cells(self, sprite, cells):
+        """
+        Puts the sprite into every cell in the range
+        """
+        for x in range(cells[0], cells[2] + 1):
+            for y in range(cells[1], cells[3] + 1):
+                self.__cells.setdefault((x, y), set()).add(sprite)
+
+    def __remove_cells(self, sprite, cells):
+        """
+        Takes the sprite out of every cell in the range, forgetting cells that become empty
+        """
+        for x in range(cells[0], cells[2] + 1):
+            for y in range(cells[1], cells[3] + 1):
+                cell = self.__cells.get((x, y))
+                if cell is not None:
+                    cell.discard(sprite)
+                    if not cell:
+                        del self.__cells[(x, y)]
+
+    def insert(self, sprite):
+        """
+        Adds the sprite to the grid at its current rectangle
+        :param sprite: a sprite with a get_world_rect function and a spatial_hashes list
+        """
+        if sprite not in self.__sprites:
+            rect = sprite.get_world_rect()
+            cells = self.__range(rect)
+            self.__sprites[sprite] = (cells, rect)
+            self.__add_cells(sprite, cells)
+            sprite.spatial_hashes.append(self)
+
+    def remove(self, sprite):
+        """
+        Takes the sprite out of the grid
+        """
+        entry = self.__sprites.pop(sprite, None)
+        if entry is not None:
+            self.__remove_cells(sprite, entry[0])
+            sprite.spatial_hashes.remove(self)
+
+    def update(self, sprite):
+        """
+        Called by the sprite when it moves. Only changes the cells when it moved into different ones.
+        """
+        entry = self.__sprites.get(sprite)
+        if entry is not None:
+            rect = sprite.get_world_rect()
+            cells = self.__range(rect)
+            if cells != entry[0]:
+                self.__remove_cells(sprite, entry[0])
+                self.__add_cells(sprite, cells)
+            self.__sprites[sprite] = (cells, rect)
+
+    def query(self, rect):
+        """
+        Finds the sprites whose rectangles overlap the rectangle
+        :param rect: rectangle in background coordinates
+        :return: list of sprites
+        """
+        left, top, right, bottom = self.__range(rect)
+        found = []
+        if left == right and top == bottom:  # most queries are inside one cell so no sprite is seen twice
+            cell = self.__cells.get((left, top), ())
+            self.__tested += len(cell)
+            for spr in cell:
+                if rect.colliderect(self.__sprites[spr][1]):
+                    found.append(spr)
+            return found
+
+        seen = set()
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                for spr in self.__cells.get((x, y), ()):
+                    if spr not in seen:
+                        seen.add(spr)
+                        if rect.colliderect(self.__sprites[spr][1]):
+                            found.append(spr)
+        self.__tested += len(seen)
+        return found
+
+    def clear(self):
+        """
+        Takes every sprite out of the grid
+        """
+        for spr in self.__sprites.keys():
+            self.remove(spr)
+
+    def __contains__(self, sprite):
+        """
+        :return: A boolean representing whether the sprite is in the grid
+        """
+        return sprite in self.__sprites
+
+    def __len__(self):
+        """
+        :return: The number of sprites in the grid
+        """
+        return len(self.__sprites)
+
+    def __str__(self):
+        """
+        :return: A string providing the number of sprites and the number of cells in use
+        """
+        return 'Sprites: ' + str(len(self.__sprites)) + '   Cells: ' + str(len(self.__cells))
+
+
+class Placer(object):
+    """
+    Keeps the things placed on the background apart from each other and out of the exclusion zones, such as the
+    house, so they do not overlap.
+    It uses rejection sampling, not Poisson-disc sampling. Each thing is a circle at a random position given by the
+    caller, so a cluster keeps its spread around its center. The positions that are not free are thrown away and
+    replaced with new random positions, up to a number of tries.
+    With numpy the background is an occupancy grid of small cells marking what is taken. A batch is checked against
+    it at once and only the free positions are compared with each other one at a time. Circles are kept apart to
+    within the size of a cell.
+    Without numpy the circles are kept in larger cells and each position is compared with the circles near it.
+    The two ways take slightly different positions, so the same seed places things differently with and without numpy.
+    A thing that finds no free place in its tries is put at its last position without checking, so a crowded place
+    still gets everything. When nearly none of many things find a free place the rest are put down without trying
+    more.
+    """
+    def __init__(self, width, height, cell_size=10, tries=20):
+        """
+        Initializes the empty background
+        :param width: the width of the background
+        :param height: the height of the background
+        :param cell_size: width and height of each cell of the occupancy grid in pixels. Without numpy the cells are
+            10 times as large
+        :param tries: the number of positions tried for each thing
+        """
+        self.__cell_size = max(1, int(cell_size))
+        self.__tries = max(1, tries)
+        self.__zones = []  # rectangles nothing is placed in
+        self.__crowded = 0
+        self.__grid = None  # with numpy, a boolean for each cell of whether it is taken
+        self.__cells = {}  # without numpy, (x, y): list of (x, y, radius) of the circles with their center in the cell
+        if numpy is None:
+            self.__cell_size *= 10
+            self.__largest = 0  # the largest radius placed, so a check knows how many cells around it to look at
+        else:
+            self.__grid = numpy.zeros((height // self.__cell_size + 1, width // self.__cell_size + 1), dtype=bool)
+            self.__stencils = {}  # radius: the row and column offsets of the cells a circle that size covers
+
+    def exclude(self, rect):
+        """
+        Keeps everything placed from now on out of the rectangle
+        :param rect: rectangle in background coordinates
+        """
+        rect = pygame.Rect(rect)
+        if self.__grid is None:
+            self.__zones.append(rect)
+            return
+        c = self.__cell_size
+        self.__grid[max(0, rect.top // c):max(0, (rect.bottom - 1) // c + 1),
+                    max(0, rect.left // c):max(0, (rect.right - 1) // c + 1)] = True
+
+    def keep_apart(self, positions, radius, more):
+        """
+        Places things at the positions, moving the ones that overlap something to new positions
+        :param positions: list of x, y positions, such as from rand_position
+        :param radius: the radius of the circle each thing takes up, usually half the size of its image
+        :param more: function taking a number and returning a list of that many new x, y positions
+        :return: list of the positions in the same order, with the moved ones replaced
+        """
+        positions = list(positions)
+        waiting = range(len(positions))
+        candidates = positions
+        full = False
+        for attempt in range(self.__tries):
+            last = full or attempt == self.__tries - 1
+            if self.__grid is None:
+                placed = self.__place_lists(candidates, radius, last)
+            else:
+                placed = self.__place_arrays(candidates, radius, last)
+            still = []
+            for n, position, free in zip(waiting, candidates, placed):
+                if free:
+                    positions[n] = position
+                else:
+                    still.append(n)
+            # fewer than one in tries found a free place, so most of the rest would not find one in all their tries
+            full = len(waiting) >= self.__tries and (len(waiting) - len(still)) * self.__tries < len(waiting)
+            waiting = still
+            if not waiting:
+                break
+            candidates = more(len(waiting))
+        return positions
+
+    def __place_arrays(self, candidates, radius, last):
+        """
+        Checks a batch of positions against the occupancy grid and marks the free ones as taken
+        :param candidates: list of x, y positions
+        :param radius: the radius of each thing
+        :param last: when True every position is taken without checking
+        :return: list of booleans of which positions were taken
+        """
+        c = self.__cell_size
+        stencil = self.__stencils.get(radius)
+        if stencil is None:
+            reach = int(radius) // c + 1
+            oy, ox = numpy.mgrid[-reach:reach + 1, -reach:reach + 1]
+            # the cells whose centers are within half a cell of the circle, so two circles that only overlap a little
+            # still share a cell
+            inside = (oy * oy + ox * ox) * c * c <= (radius + c / 2.0) * (radius + c / 2.0)
+            stencil = self.__stencils[radius] = (oy[inside], ox[inside])
+        points = numpy.array(candidates, dtype=numpy.float64).reshape(-1, 2)
+        rows = (points[:, 1] // c).astype(numpy.int64)[:, None] + stencil[0]
+        columns = (points[:, 0] // c).astype(numpy.int64)[:, None] + stencil[1]
+        height, width = self.__grid.shape
+        valid = (rows >= 0) & (rows < height) & (columns >= 0) & (columns < width)  # off the background is free
+        rows = rows.clip(0, height - 1)
+        columns = columns.clip(0, width - 1)
+        if last:
+            self.__crowded += len(points)
+            self.__grid[rows[valid], columns[valid]] = True
+            return [True] * len(points)
+        free = ~(self.__grid[rows, columns] & valid).any(axis=1)
+
+        # the free positions can still overlap each other, so they are compared with the ones taken before them
+        taken = numpy.zeros(len(points), dtype=bool)
+        apart = max(1, radius * 2)
+        near = {}  # (x, y) of a cell the size of a circle: positions taken in it
+        for n in numpy.flatnonzero(free).tolist():
+            x, y = points[n]
+            cell_x = int(x // apart)
+            cell_y = int(y // apart)
+            if not any((px - x) * (px - x) + (py - y) * (py - y) < apart * apart
+                       for nx in (cell_x - 1, cell_x, cell_x + 1) for ny in (cell_y - 1, cell_y, cell_y + 1)
+                       for px, py in near.get((nx, ny), ())):
+                near.setdefault((cell_x, cell_y), []).append((x, y))
+                taken[n] = True
+        keep = valid & taken[:, None]
+        self.__grid[rows[keep], columns[keep]] = True
+        return taken.tolist()
+
+    def __place_lists(self, candidates, radius, last):
+        """
+        Checks the positions one at a time against the circles near them and places the free ones
+        :param candidates: list of x, y positions
+        :param radius: the radius of each thing
+        :param last: when True every position is taken without checking
+        :return: list of booleans of which positions were taken
+        """
+        c = self.__cell_size
+        taken = []
+        checked = 0
+        found = 0
+        for x, y in candidates:
+            # as in keep_apart, the rest are taken without checking once fewer than one in tries were free
+            if not last and checked >= self.__tries and found * self.__tries < checked:
+                last = True
+            if last:
+                self.__crowded += 1
+                free = True
+            else:
+                free = self.__free(x, y, radius)
+                checked += 1
+                found += free
+            if free:
+                self.__cells.setdefault((int(x // c), int(y // c)), []).append((x, y, radius))
+            taken.append(free)
+        self.__largest = max(self.__largest, radius)
+        return taken
+
+    def __free(self, x, y, radius):
+        """
+        :param x: x axis of the center in background coordinates
+        :param y: y axis of the center
+        :param radius: the radius of the circle
+        :return: A boolean representing whether the circle is clear of everything placed and every exclusion zone
+        """
+        for zone in self.__zones:
+            dx = max(zone.left - x, 0, x - zone.right)  # distance from the center to the rectangle
+            dy = max(zone.top - y, 0, y - zone.bottom)
+            if dx * dx + dy * dy < radius * radius:
+                return False
+        c = self.__cell_size
+        for px, py, pr in self.__cells.get((int(x // c), int(y // c)), ()):  # its own cell first, where most are
+            if (px - x) * (px - x) + (py - y) * (py - y) < (pr + radius) * (pr + radius):
+                return False
+        reach = radius + self.__largest
+        for cell_x in range(int((x - reach) // c), int((x + reach) // c) + 1):
+            for cell_y in range(int((y - reach) // c), int((y + reach) // c) + 1):
+                for px, py, pr in self.__cells.get((cell_x, cell_y), ()):
+                    if (px - x) * (px - x) + (py - y) * (py - y) < (pr + radius) * (pr + radius):
+                        return False
+        return True
+
+    def get_crowded(self):
+        """
+        :return: The number of things placed without checking because none of their other tries was free
+        """
+        return self.__crowded
+
+
+def world_rect(rect, background_position):
+    """
+    :param rect: rectangle on the screen
+    :param background_position: the x, y coordinates of the background
+    :return: the same rectangle in background coordinates
+    """
+    return pygame.Rect(rect).move(-background_position[0], -background_position[1])
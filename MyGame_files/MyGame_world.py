@@ -0,0 +1,264 @@
+__author__ = 'ElectroNick'
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+    print 'Warning, numpy not found, the components of the entities are kept in lists'
+
+# The components of every entity and their starting values. Each component is kept in its own array with a row for
+# each entity, so a system can work on one component of every entity at once.
+COMPONENTS = [
+    ('x', 0),  # position on the background
+    ('y', 0),
+    ('dx', 0),  # the direction it moves in next: -1, 0 or 1
+    ('dy', 0),
+    ('speed', 0),  # pixels moved each tick
+    ('w', 0),  # the width and height of the box centered on its position that it touches other things with
+    ('h', 0),
+    ('pattern', 0),  # how it moves, such as Herd.SQUARE
+    ('sec', 60),  # the ticks it takes to go once around its pattern
+    ('turn', 0),  # the Foe turn and count variables of its pattern
+    ('count', 0),
+]
+
+# The components that can hold fractions. They hold whole numbers until a fraction is put in one of their rows,
+# so whole number positions stay whole
+FRACTIONS = ['x', 'y', 'speed']
+
+
+class World(object):
+    """
+    Keeps entities as rows of component arrays instead of each in its own object, so the systems such as movement
+    and collision work on every entity at once. Only the foes are kept in one so far, see FoeEngine.
+    An entity is only a row number. It can have a sprite to draw it. The sprite keeps its own copy of what it is drawn
+    with, which FoeEngine writes the components into when the entity is near the window.
+    The rows of removed entities are used again for new ones.
+    Without numpy the components are kept in lists and the systems go through the entities one at a time.
+    """
+    def __init__(self, capacity=64):
+        """
+        Initializes the world without any entities
+        :param capacity: the number of rows to make room for at first. More are made when they are needed
+        """
+        self.__size = 0  # the rows used so far, including the ones of removed entities
+        self.__capacity = 0
+        self.__free = []  # rows of removed entities
+        self.__sprites = []  # the sprite of each row or None
+        self.__alive = None
+        self.__columns = {}  # component name: array with a row for each entity
+        self.__grow(max(1, capacity))
+
+    def __grow(self, capacity):
+        """
+        Makes room for more rows, keeping the components already set
+        :param capacity: the new number of rows
+        """
+        extra = capacity - self.__capacity
+        if numpy is None:
+            for name, start in COMPONENTS:
+                self.__columns.setdefault(name, []).extend([start] * extra)
+            self.__alive = (self.__alive or []) + [False] * extra
+        else:
+            for name, start in COMPONENTS:
+                old = self.__columns.get(name)
+                dtype = numpy.int64 if old is None else old.dtype
+                column = numpy.full(capacity, start, dtype=dtype)
+                if old is not None:
+                    column[:self.__capacity] = old
+                self.__columns[name] = column
+            alive = numpy.zeros(capacity, dtype=bool)
+            if self.__alive is not None:
+                alive[:self.__capacity] = self.__alive
+            self.__alive = alive
+        self.__sprites.extend([None] * extra)
+        self.__capacity = capacity
+
+    def spawn(self, sprite=None, **components):
+        """
+        Adds an entity
+        :param sprite: the sprite that draws it, or None
+        :param components: the starting value of any of the COMPONENTS, such as x=10. The others start as in
+            COMPONENTS
+        :return: the integer row of the entity
+        """
+        if self.__free:
+            row = self.__free.pop()
+        else:
+            if self.__size == self.__capacity:
+                self.__grow(self.__capacity * 2)
+            row = self.__size
+            self.__size += 1
+        self.__alive[row] = True
+        self.__sprites[row] = sprite
+        for name, start in COMPONENTS:
+            self.set(name, row, components.get(name, start))
+        return row
+
+    def despawn(self, row):
+        """
+        Removes an entity so its row can be used again
+        :param row: the row of the entity
+        """
+        if not self.__alive[row]:
+            return
+        self.__alive[row] = False
+        self.__sprites[row] = None
+        for name, start in COMPONENTS:
+            self.__columns[name][row] = start  # stands still, so the systems can go over its row without any effect
+        self.__free.append(row)
+
+    def get(self, name, row):
+        """
+        :param name: the name of the component, such as 'x'
+        :param row: the row of the entity
+        :return: the value of the component of the entity as a python number
+        """
+        if numpy is None:
+            return self.__columns[name][row]
+        return self.__columns[name].item(row)
+
+    def set(self, name, row, value):
+        """
+        Sets the component of one entity
+        :param name: the name of the component, such as 'x'
+        :param row: the row of the entity
+        :param value: the number to set it to
+        """
+        column = self.__columns[name]
+        if numpy is not None and column.dtype != numpy.float64 and not isinstance(value, (int, long)):
+            if name not in FRACTIONS:
+                raise ValueError(name + ' can only hold whole numbers')
+            for fraction in FRACTIONS:  # all of them, so they can still be added and multiplied in place
+                self.__columns[fraction] = self.__columns[fraction].astype(numpy.float64)
+            column = self.__columns[name]
+        column[row] = value
+
+    def gather(self, name, rows):
+        """
+        :param name: the name of the component, such as 'x'
+        :param rows: list of the rows of entities
+        :return: list of the component of each of the entities as python numbers
+        """
+        column = self.__columns[name]
+        if numpy is None:
+            return [column[row] for row in rows]
+        return column[rows].tolist()
+
+    def column(self, name):
+        """
+        :param name: the name of the component, such as 'x'
+        :return: the component of every row used so far, including the rows of removed entities. With numpy the
+            array can be changed in place to change the component, without numpy it is the list itself
+        """
+        if numpy is None:
+            return self.__columns[name]
+        return self.__columns[name][:self.__size]
+
+    def set_column(self, name, values):
+        """
+        Sets the component of every row used so far
+        :param name: the name of the component, such as 'dx'
+        :param values: array with a number for each row
+        """
+        if numpy is None:
+            self.__columns[name][:self.__size] = list(values)
+        else:
+            self.__columns[name][:self.__size] = values
+
+    def get_sprite(self, row):
+        """
+        :param row: the row of the entity
+        :return: the sprite of the entity or None
+        """
+        return self.__sprites[row]
+
+    def get_rows(self):
+        """
+        :return: list of the rows of every entity in order
+        """
+        if numpy is None:
+            return [row for row in xrange(self.__size) if self.__alive[row]]
+        return numpy.flatnonzero(self.__alive[:self.__size]).tolist()
+
+    def get_size(self):
+        """
+        :return: The number of rows used so far, including the rows of removed entities
+        """
+        return self.__size
+
+    def __len__(self):
+        """
+        :return: The number of entities
+        """
+        return self.__size - len(self.__free)
+
+    # Systems
+
+    def move(self):
+        """
+        The movement system. Moves every entity its speed in its direction
+        """
+        x = self.column('x')
+        y = self.column('y')
+        if numpy is None:
+            dx = self.column('dx')
+            dy = self.column('dy')
+            speed = self.column('speed')
+            for row in xrange(self.__size):
+                x[row] += dx[row] * speed[row]
+                y[row] += dy[row] * speed[row]
+            return
+        speed = self.column('speed')
+        x += self.column('dx') * speed
+        y += self.column('dy') * speed
+
+    def near(self, background_position, width, height, margin):
+        """
+        The culling system. Finds the entities near the window
+        :param background_position: the x, y coordinates of the top left corner of the background on the screen
+        :param width: the width of the window
+        :param height: the height of the window
+        :param margin: how far outside the window in pixels an entity is still near
+        :return: list of the rows in order
+        """
+        if numpy is None:
+            x = self.column('x')
+            y = self.column('y')
+            near = []
+            for row in self.get_rows():
+                screen_x = x[row] + background_position[0]
+                screen_y = y[row] + background_position[1]
+                if -margin <= screen_x <= width + margin and -margin <= screen_y <= height + margin:
+                    near.append(row)
+            return near
+        screen_x = self.column('x') + background_position[0]
+        screen_y = self.column('y') + background_position[1]
+        near = ((screen_x >= -margin) & (screen_x <= width + margin) &
+                (screen_y >= -margin) & (screen_y <= height + margin) & self.__alive[:self.__size])
+        return numpy.flatnonzero(near).tolist()
+
+    def touching(self, rect):
+        """
+        The collision system. Finds the entities whose box overlaps the rectangle. The boxes are made a pixel larger
+        on every side, so an entity whose sprite is placed at a position rounded to whole pixels is never missed
+        :param rect: rectangle in background coordinates
+        :return: list of the rows in order
+        """
+        # the distance between the centers is less than half their widths and heights together. Doubled, so it stays
+        # in whole numbers for whole number positions
+        if numpy is None:
+            x = self.column('x')
+            y = self.column('y')
+            w = self.column('w')
+            h = self.column('h')
+            touching = []
+            for row in self.get_rows():
+                if (abs(x[row] * 2 - rect.left - rect.right) < w[row] + rect.width + 4 and
+                        abs(y[row] * 2 - rect.top - rect.bottom) < h[row] + rect.height + 4):
+                    touching.append(row)
+            return touching
+        touching = ((numpy.abs(self.column('x') * 2 - rect.left - rect.right) < self.column('w') + rect.width + 4) &
+                    (numpy.abs(self.column('y') * 2 - rect.top - rect.bottom) < self.column('h') + rect.height + 4) &
+                    self.__alive[:self.__size])
+        return numpy.flatnonzero(touching).tolist()